@@ -24,3 +24,162 @@ def test_add_transactions_df_generates_txid_when_missing(temp_db):
     assert added == 1 and skipped == 0
     rows = db.fetch_transactions()
     assert any(r["original_description"].startswith("PUBLIX") for r in rows)
+
+def test_add_transactions_df_stores_integer_cents(temp_db):
+    df = pd.DataFrame([
+        {"transaction_id":"c1","transaction_date":"2025-08-09","original_description":"COFFEE","amount":-0.30},
+    ])
+    added, skipped = db.add_transactions_df(df, "Account C")
+    assert added == 1 and skipped == 0
+    row = next(r for r in db.fetch_transactions() if r["transaction_id"] == "c1")
+    assert row["amount_cents"] == -30
+    # float drift must not change the fingerprint
+    assert db._fingerprint(1, "2025-08-09", "COFFEE", -0.30) == db._fingerprint(1, "2025-08-09", "COFFEE", -0.29999999999)
+
+def test_fingerprint_amount_text_matches_old_basis(temp_db):
+    import hashlib
+    amounts = [0.005, 0.015, 2.675, 1.125, -0.005, -0.0, -0.004]
+    old = [
+        hashlib.sha1(f"1|2025-08-09|{a:.2f}|{db._normalized_event_for_fp('FEE')}".encode("utf-8")).hexdigest()[:24]
+        for a in amounts
+    ]
+    assert [db._fingerprint(1, "2025-08-09", "FEE", a) for a in amounts] == old
+    assert db._fingerprints(1, ["2025-08-09"] * len(amounts), ["FEE"] * len(amounts), amounts) == old
+
+    # amount_cents: Python writer and SQLite trigger/backfill use one rounding rule,
+    # and a fingerprint rebuilt from the stored row equals the one stored at insert
+    df = pd.DataFrame([
+        {"transaction_id": f"h{i}", "transaction_date": "2025-08-09", "original_description": f"FEE {i}", "amount": a}
+        for i, a in enumerate([0.005, 0.015, 2.675, 1.125])
+    ])
+    db.add_transactions_df(df, "Account H")
+    conn = db.get_db_connection()
+    try:
+        rows = conn.execute(
+            "SELECT account_id, transaction_date, original_description, cleaned_description, amount, amount_cents, "
+            "CAST(ROUND(amount * 100) AS INTEGER) AS sql_cents, unique_fingerprint FROM transactions"
+        ).fetchall()
+    finally:
+        conn.close()
+    assert len(rows) == 4
+    for r in rows:
+        assert r["amount_cents"] == r["sql_cents"]
+        combined = f"{r['original_description']} {r['cleaned_description']}"
+        assert db._fingerprint(r["account_id"], r["transaction_date"], combined, r["amount"]) == r["unique_fingerprint"]
+
+def test_amount_cents_follows_amount_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "fresh.db"), raising=False)
+    db.initialize_database()  # no v1 migrations: triggers must come from initialize_database
+    conn = db.get_db_connection()
+    try:
+        acct = db.get_or_create_account(conn, "Account G")
+        conn.execute("INSERT INTO transactions(transaction_id, transaction_date, account_id, amount) VALUES ('t1', '2025-08-09', ?, -12.34)", (acct,))
+        conn.execute("UPDATE transactions SET amount = ABS(amount) WHERE transaction_id='t1'")
+        assert conn.execute("SELECT amount_cents FROM transactions WHERE transaction_id='t1'").fetchone()[0] == 1234
+    finally:
+        conn.close()
+
+def test_category_rules_match_on_merchant_key(temp_db):
+    df = pd.DataFrame([
+        {"transaction_id":"r1","transaction_date":"2025-08-09","original_description":"PUBLIX #123 TAMPA","amount":-40.00},
+        {"transaction_id":"r2","transaction_date":"2025-08-09","original_description":"SHELL OIL 5512","amount":-30.00},
+    ])
+    db.add_transactions_df(df, "Account D")
+    conn = db.get_db_connection()
+    try:
+        conn.executemany(
+            "INSERT INTO category_rules(merchant_pattern, category, subcategory) VALUES (?,?,?)",
+            [("publix", "Groceries", "Supermarket"), ("shell", "Auto", "Gas")],
+        )
+        db.apply_category_rules(conn)
+        rows = {r["transaction_id"]: r for r in conn.execute(
+            "SELECT transaction_id, category, subcategory, merchant_key FROM transactions")}
+    finally:
+        conn.close()
+    assert (rows["r1"]["category"], rows["r1"]["subcategory"]) == ("Groceries", "Supermarket")
+    assert (rows["r2"]["category"], rows["r2"]["subcategory"]) == ("Auto", "Gas")
+    assert rows["r1"]["merchant_key"] == rows["r1"]["merchant_key"].lower()
+
+def test_category_rules_see_merchants_set_by_earlier_rules(temp_db, monkeypatch):
+    # default buffer scan and the trigram index must give the same result
+    for min_rules, acct in ((db.TRIGRAM_MIN_RULES, "Account J"), (1, "Account K")):
+        monkeypatch.setattr(db, "TRIGRAM_MIN_RULES", min_rules)
+        conn = db.get_db_connection()
+        try:
+            conn.execute("DELETE FROM transactions")
+            conn.execute("DELETE FROM category_rules")
+            conn.commit()
+        finally:
+            conn.close()
+        db.add_transactions_df(pd.DataFrame([
+            {"transaction_id":"k1","transaction_date":"2025-08-09","original_description":"SQ *JP 4411","amount":-12.00},
+            {"transaction_id":"k2","transaction_date":"2025-08-09","original_description":"SHELL OIL 5512","amount":-30.00},
+        ]), acct)
+        conn = db.get_db_connection()
+        try:
+            conn.execute("UPDATE transactions SET merchant=NULL")  # key falls back to the description
+            conn.executemany(
+                "INSERT INTO category_rules(merchant_pattern, category, subcategory, merchant_canonical) VALUES (?,?,?,?)",
+                [("sq *jp", "", None, "Joes Pizza"), ("joes pizza", "Dining", "Pizza", None), ("shell", "Auto", None, None)],
+            )
+            db.apply_category_rules(conn)
+            rows = {r["transaction_id"]: r for r in conn.execute(
+                "SELECT transaction_id, merchant, category, ai_category FROM transactions")}
+        finally:
+            conn.close()
+        assert rows["k1"]["merchant"] == "JOES PIZZA"
+        assert (rows["k1"]["category"], rows["k1"]["ai_category"]) == ("Dining", "Dining")
+        assert (rows["k2"]["category"], rows["k2"]["ai_category"]) == ("Auto", "Auto")
+
+def test_get_db_connection_isolates_nested_callers(temp_db):
+    outer = db.get_db_connection()
+    try:
+        outer.execute("INSERT INTO accounts(name) VALUES ('Pending')")
+        inner = db.get_db_connection()
+        try:
+            assert inner is not outer
+            # a nested helper's commit must not publish the caller's pending write
+            inner.commit()
+            assert inner.execute("SELECT COUNT(*) FROM accounts WHERE name='Pending'").fetchone()[0] == 0
+        finally:
+            inner.close()
+        outer.rollback()
+        assert outer.execute("SELECT COUNT(*) FROM accounts WHERE name='Pending'").fetchone()[0] == 0
+    finally:
+        outer.close()
+
+def test_autofill_subcategory_batch_prefers_longest_rule(temp_db):
+    df = pd.DataFrame([
+        {"transaction_id":"s1","transaction_date":"2025-08-09","original_description":"PUBLIX 12 TAMPA","amount":-40.00},
+        {"transaction_id":"s2","transaction_date":"2025-08-09","original_description":"PUBLIX 99 MIAMI","amount":-10.00},
+    ])
+    db.add_transactions_df(df, "Account E")
+    conn = db.get_db_connection()
+    try:
+        conn.executemany(
+            "INSERT INTO category_rules(merchant_pattern, category, subcategory) VALUES (?,?,?)",
+            [("pub", "Groceries", "Generic"), ("publix", "Groceries", "Supermarket")],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    assert db.autofill_subcategory_for_txids(["s1", "s2", "missing"], "Groceries") == {"s1": "Supermarket", "s2": "Supermarket"}
+    assert db.autofill_subcategory_for_tx("s1", "Travel") is None
+
+def test_blank_rule_pattern_matches_nothing(temp_db):
+    df = pd.DataFrame([
+        {"transaction_id":"b1","transaction_date":"2025-08-09","original_description":"SHELL OIL 5512","amount":-30.00},
+    ])
+    db.add_transactions_df(df, "Account F")
+    conn = db.get_db_connection()
+    try:
+        conn.executemany(
+            "INSERT INTO category_rules(merchant_pattern, category, subcategory) VALUES (?,?,?)",
+            [(None, "Travel", "Hotel"), ("", "Travel", "Air")],
+        )
+        db.apply_category_rules(conn)
+        row = conn.execute("SELECT category, subcategory FROM transactions WHERE transaction_id='b1'").fetchone()
+    finally:
+        conn.close()
+    assert row["category"] in (None, "", "Uncategorized") and not row["subcategory"]
+    assert db.autofill_subcategory_for_tx("b1", "Travel") is None
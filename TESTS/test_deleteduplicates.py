@@ -0,0 +1,22 @@
+# tests/test_deleteduplicates.py
+import pandas as pd
+from deleteduplicates import dedupe_csv, iter_csv_chunks
+
+def test_blank_header_cell_reads_like_pandas(tmp_path):
+    src = tmp_path / "stmt.csv"
+    src.write_text(
+        "Date,Amount,,Description\n"
+        "08/21/2025,-10.00,*,SUNPASS 1\n"
+        "08/21/2025,-10.00,*,SUNPASS 1\n"
+        "08/20/2025,-5.00,*,PUBLIX\n",
+        encoding="utf-8",
+    )
+    expected = pd.read_csv(src, dtype=str, keep_default_na=False, na_filter=False)
+    chunk = next(iter_csv_chunks(str(src)))
+    assert list(chunk.columns) == list(expected.columns) == ["Date", "Amount", "Unnamed: 2", "Description"]
+
+    out = tmp_path / "clean.csv"
+    dedupe_csv(str(src), out)
+    lines = out.read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "Date,Amount,Unnamed: 2,Description"
+    assert len(lines) == 3
@@ -499,8 +499,7 @@ def responses_batch(client: OpenAI, model: str, tx_texts: List[str], temperature
         merchants = []
     return _coerce_len(merchants, len(tx_texts))
 
-def chat_batch(client: OpenAI, model: str, tx_texts: List[str], temperature: float = 0.0) -> List[str]:
-    """Fallback to Chat Completions with JSON object."""
+def _chat_batch_messages(tx_texts: List[str]) -> list:
     numbered = "\n".join(f"{i+1}. {t}" for i, t in enumerate(tx_texts))
     user_prompt = (
         "Extract ONLY the merchant/trade name for each transaction line below. "
@@ -508,14 +507,18 @@ def chat_batch(client: OpenAI, model: str, tx_texts: List[str], temperature: flo
         "The array length MUST equal the number of lines. No prose.\n\n"
         f"TRANSACTIONS:\n{numbered}"
     )
+    return [
+        {"role": "system", "content": SYS_INSTRUCTIONS},
+        {"role": "user", "content": user_prompt},
+    ]
+
+def chat_batch(client: OpenAI, model: str, tx_texts: List[str], temperature: float = 0.0) -> List[str]:
+    """Fallback to Chat Completions with JSON object."""
     resp = client.chat.completions.create(
         model=model,
         temperature=temperature,
         response_format={"type": "json_object"},
-        messages=[
-            {"role": "system", "content": SYS_INSTRUCTIONS},
-            {"role": "user", "content": user_prompt},
-        ],
+        messages=_chat_batch_messages(tx_texts),
     )
     # Be defensive about odd outputs; never raise on length mismatch.
     try:
@@ -578,25 +581,9 @@ def backoff_sleep(attempt: int, base: float = 1.6, cap: float = 30.0):
     sleep_s = min(cap, (base ** attempt) + random.uniform(0, 1.0))
     time.sleep(sleep_s)
 
-# ----------------- Public API (used by app.py) -----------------
-
-def extract_merchant_names(
-    descriptions: List[str],
-    model: str = "gpt-4o",
-    batch_size: int = 40,
-    temperature: float = 0.0,
-    max_retries: int = 3,
-    disable_progress: bool = False
-) -> List[str]:
-    """
-    Extract merchant names for a list of transaction description strings.
-
-    Returns a list of strings, aligned to the input order.
-    If OPENAI_API_KEY is missing, returns the original descriptions unchanged (graceful fallback).
-    """
-    # (NEW) Pre-fill obvious P2P cases deterministically BEFORE any model calls
-    n = len(descriptions)
-    prefilled = [None] * n
+def _prefill_deterministic(descriptions: List[str]) -> List[str | None]:
+    """Transfer / P2P names decided without the model; None where the AI is needed."""
+    prefilled = [None] * len(descriptions)
     for i, raw in enumerate(descriptions):
         txt = str(raw or "")
 
@@ -616,16 +603,40 @@ def extract_merchant_names(
             m = None
         if m:
             prefilled[i] = clean_merchant_name(m)
+    return prefilled
+
+def _no_api_fallback(descriptions: List[str], prefilled: List[str | None]) -> List[str]:
+    # Keep your original behavior: no API -> return inputs unchanged,
+    # but preserve any prefilled P2P wins we got for free.
+    out = [str(x or "") for x in descriptions]
+    for i, v in enumerate(prefilled):
+        if v:  # only overwrite when we have a deterministic P2P result
+            out[i] = v
+    print("WARNING: OPENAI_API_KEY not set. Returned originals (with P2P prefill where possible).", file=sys.stderr)
+    return out
+
+# ----------------- Public API (used by app.py) -----------------
+
+def extract_merchant_names(
+    descriptions: List[str],
+    model: str = "gpt-4o",
+    batch_size: int = 40,
+    temperature: float = 0.0,
+    max_retries: int = 3,
+    disable_progress: bool = False
+) -> List[str]:
+    """
+    Extract merchant names for a list of transaction description strings.
+
+    Returns a list of strings, aligned to the input order.
+    If OPENAI_API_KEY is missing, returns the original descriptions unchanged (graceful fallback).
+    """
+    # (NEW) Pre-fill obvious P2P cases deterministically BEFORE any model calls
+    n = len(descriptions)
+    prefilled = _prefill_deterministic(descriptions)
 
     if not os.getenv("OPENAI_API_KEY"):
-        # Keep your original behavior: no API -> return inputs unchanged,
-        # but preserve any prefilled P2P wins we got for free.
-        out = [str(x or "") for x in descriptions]
-        for i, v in enumerate(prefilled):
-            if v:  # only overwrite when we have a deterministic P2P result
-                out[i] = v
-        print("WARNING: OPENAI_API_KEY not set. Returned originals (with P2P prefill where possible).", file=sys.stderr)
-        return out
+        return _no_api_fallback(descriptions, prefilled)
 
     client = OpenAI()
     extracted = [""] * n
@@ -684,6 +695,77 @@ def extract_merchant_names(
     final_names = [clean_merchant_name(s) if s else "Unknown" for s in extracted]
     return final_names
 
+def extract_merchant_names_batch_api(
+    descriptions: List[str],
+    model: str = "gpt-4o",
+    batch_size: int = 40,
+    temperature: float = 0.0,
+    poll_seconds: float = 30.0,
+) -> List[str]:
+    """
+    Same contract as extract_merchant_names, for offline bulk jobs: every
+    unresolved chunk becomes one request in a single OpenAI Batch API job
+    (half the token price, parallelism/retries handled server-side, up to a
+    24h window). Blocks while polling. Chunks the job did not return are
+    retried through the synchronous batch call.
+    """
+    n = len(descriptions)
+    prefilled = _prefill_deterministic(descriptions)
+    if not os.getenv("OPENAI_API_KEY"):
+        return _no_api_fallback(descriptions, prefilled)
+
+    texts = [str(x or "") for x in descriptions]
+    todo = [i for i, v in enumerate(prefilled) if not v]
+    chunks = {f"chunk-{start}": todo[start:end] for start, end in chunk_indices(len(todo), batch_size)}
+    extracted = list(prefilled)
+    if chunks:
+        client = OpenAI()
+        lines = [
+            json.dumps({
+                "custom_id": cid,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": model,
+                    "temperature": temperature,
+                    "response_format": {"type": "json_object"},
+                    "messages": _chat_batch_messages([texts[i] for i in idx]),
+                },
+            })
+            for cid, idx in chunks.items()
+        ]
+        upload = client.files.create(file=("merchants.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch")
+        job = client.batches.create(input_file_id=upload.id, endpoint="/v1/chat/completions", completion_window="24h")
+        print(f"Submitted batch {job.id}: {len(chunks)} requests for {len(todo)} descriptions.")
+        while job.status not in ("completed", "failed", "expired", "cancelled"):
+            time.sleep(poll_seconds)
+            job = client.batches.retrieve(job.id)
+        print(f"Batch {job.id} finished with status '{job.status}'.")
+
+        results = {}
+        if job.output_file_id:
+            for line in client.files.content(job.output_file_id).text.splitlines():
+                try:
+                    item = json.loads(line)
+                    content = item["response"]["body"]["choices"][0]["message"]["content"]
+                    results[item["custom_id"]] = json.loads(content).get("merchants", [])
+                except Exception:
+                    continue
+        for cid, idx in chunks.items():
+            merchants = results.get(cid)
+            if merchants is None:
+                try:
+                    preds = call_openai_batch(client, model, [texts[i] for i in idx], temperature=temperature)
+                except Exception as e:
+                    print(f"Fallback for {cid} failed: {e}", file=sys.stderr)
+                    preds = ["Unknown"] * len(idx)
+            else:
+                preds = _coerce_len(merchants, len(idx))
+            for i, name in zip(idx, preds):
+                extracted[i] = name
+
+    return [clean_merchant_name(s) if s else "Unknown" for s in extracted]
+
 # ----------------- CLI -----------------
 
 def main():
@@ -17,8 +17,9 @@
 #   Rules:
 #     - apply_rules_to_ai_fields(conn=None)
 #     - apply_category_rules(conn=None, overwrite=False)
+#     - autofill_subcategory_for_tx(txid, category=None), autofill_subcategory_for_txids(txids, category=None)
 #   Queries / updates:
-#     - fetch_transactions(...), fetch_summary(...), fetch_category_summary(...)
+#     - fetch_transactions(...), iter_transactions(...), fetch_summary(...), fetch_category_summary(...)
 #     - update_transaction_category_by_txid(txid, new_category, new_subcategory=None)
 #   Profile & budgets:
 #     - get_user_profile(), set_user_profile(...)
@@ -38,13 +39,21 @@ from __future__ import annotations
 
 import os
 import re
+import json
+import calendar
 import sqlite3
 import hashlib
-from typing import List, Dict, Optional, Tuple
+from functools import lru_cache
+from bisect import bisect_right
+from itertools import accumulate, repeat
+from typing import Callable, Iterator, List, Dict, Optional, Sequence, Tuple
 from datetime import datetime, date, timedelta
 from parser import extract_zelle_to_from, extract_to_from_party
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from dateutil.relativedelta import relativedelta
 
 # -------------------------------------------------------------------
@@ -55,13 +64,38 @@ PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(PROJECT_DIR, "finance.db")
 
 
+class _OptimizingConnection(sqlite3.Connection):
+    """sqlite3.Connection that refreshes planner stats on close (SQLite's recommended PRAGMA optimize)."""
+
+    def close(self):
+        try:
+            self.execute("PRAGMA optimize")
+        except sqlite3.Error:
+            pass
+        super().close()
+
+
+def _optimize(conn: sqlite3.Connection):
+    """Refresh sqlite_stat1 after bulk mutations so fetch_* keep using the right indexes."""
+    try:
+        conn.execute("PRAGMA optimize")
+    except sqlite3.Error:
+        pass
+
+
 def get_db_connection():
-    conn = sqlite3.connect(DB_PATH, detect_types=sqlite3.PARSE_DECLTYPES, timeout=30.0)
+    # One connection per call: each caller owns its transaction, so a nested
+    # helper's commit/rollback can never touch the caller's pending writes.
+    conn = sqlite3.connect(
+        DB_PATH, detect_types=sqlite3.PARSE_DECLTYPES, timeout=30.0, factory=_OptimizingConnection
+    )
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys=ON")
     conn.execute("PRAGMA journal_mode=WAL")
     conn.execute("PRAGMA synchronous=NORMAL")
     conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache
     return conn
 
 # --- Stronger normalization for global fingerprinting ---
@@ -70,6 +104,10 @@ _MASKED_RE      = re.compile(r"(?i)\bX{2,}\d+\b|\bx{2,}\d+\b")  # XXXXXX4311, xx
 _DATE_TAIL_RE   = re.compile(r"(?i)\bon\s+\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b.*$")
 _ACC_TAIL_RE    = re.compile(r"(?i)\b(?:account|acct|ending|number|no\.)\b.*$")
 _FP_MULTI_WS    = re.compile(r"\s{2,}")
+_RECURRING_RE   = re.compile(r"(?i)\brecurr?ing\b")
+# Cheap superset probe of everything the scrub regexes below can touch; most
+# descriptions contain none of these tokens and skip the scrub chain entirely.
+_NEEDS_SCRUB_RE = re.compile(r"(?i)ref|xx|\bon\s+\d|account|acct|ending|number|\bno\.|recurr?ing")
 
 def _normalized_event_for_fp(desc: str) -> str:
     """
@@ -97,6 +135,10 @@ def _normalized_event_for_fp(desc: str) -> str:
     except Exception:
         pass
 
+    # Fast lane: nothing to scrub -> just normalize whitespace/case
+    if not _NEEDS_SCRUB_RE.search(s):
+        return _FP_MULTI_WS.sub(" ", s).strip(" -:.,\t").upper()
+
     # Light scrub for all other types
     s = _REF_TOKEN_RE.sub("", s)
     s = _MASKED_RE.sub("", s)
@@ -104,7 +146,7 @@ def _normalized_event_for_fp(desc: str) -> str:
     s = _ACC_TAIL_RE.sub("", s)
 
     # Normalize a bit of wording & whitespace
-    s = re.sub(r"(?i)\brecurr?ing\b", "", s)
+    s = _RECURRING_RE.sub("", s)
     s = _FP_MULTI_WS.sub(" ", s).strip(" -:.,\t")
     return s.upper()
 
@@ -143,6 +185,8 @@ def initialize_database():
                 merchant TEXT,                          -- canonical merchant name
 
                 amount REAL NOT NULL,                   -- normalized signs
+                amount_cents INTEGER,                   -- exact integer mirror of amount (aggregates)
+                merchant_key TEXT,                      -- lower(COALESCE(merchant, cleaned_description)) for rule matching
 
                 ai_category TEXT,                       -- suggestions only
                 ai_subcategory TEXT,
@@ -188,9 +232,20 @@ def initialize_database():
 
             
             CREATE INDEX IF NOT EXISTS ix_txn_date ON transactions(transaction_date);
+            -- covering indexes for the summary/budget aggregations (index-only scans)
+            CREATE INDEX IF NOT EXISTS ix_txn_cat_date_amt ON transactions(category, transaction_date, amount);
+            CREATE INDEX IF NOT EXISTS ix_txn_date_cat_amt ON transactions(transaction_date, category, amount);
+            -- MAX() over our numeric transaction_id space is a single index seek
+            CREATE INDEX IF NOT EXISTS ix_txn_txid_int ON transactions(CAST(transaction_id AS INTEGER)) WHERE transaction_id GLOB '[0-9]*';
+            -- normalize_amount_signs only ever looks at negative rows in a few categories
+            CREATE INDEX IF NOT EXISTS ix_txn_neg_category ON transactions(lower(COALESCE(category,''))) WHERE amount < 0;
             """
         )
+        _ensure_amount_cents(conn)
+        _ensure_merchant_key(conn)
+        _ensure_description_fts(conn)
         conn.commit()
+        _optimize(conn)
         print("Database schema created/verified successfully (transaction_id is UNIQUE).")
     finally:
         conn.close()
@@ -209,11 +264,16 @@ def apply_v1_compat_migrations():
             ("transactions", "ai_subcategory", "ALTER TABLE transactions ADD COLUMN ai_subcategory TEXT"),
             ("transactions", "subcategory", "ALTER TABLE transactions ADD COLUMN subcategory TEXT"),
             ("transactions", "unique_fingerprint", "ALTER TABLE transactions ADD COLUMN unique_fingerprint TEXT"),
+            ("transactions", "amount_cents", "ALTER TABLE transactions ADD COLUMN amount_cents INTEGER"),
         ]
         for table, col, ddl in needed:
             if not has_col(table, col):
                 conn.execute(ddl)
 
+        _ensure_amount_cents(conn)
+        _ensure_merchant_key(conn)
+        _ensure_description_fts(conn)
+
         # Rules carry canonical merchant (if missing, add it)
         rows = conn.execute("PRAGMA table_info(category_rules)").fetchall()
         if not any(r["name"] == "merchant_canonical" for r in rows):
@@ -244,6 +304,14 @@ def apply_v1_compat_migrations():
             WHERE unique_fingerprint IS NOT NULL AND TRIM(unique_fingerprint) <> ''
         """)
         conn.commit()
+        # Fresh install / first migration: no sqlite_stat1 yet, so gather full stats
+        # once; after that PRAGMA optimize keeps them current incrementally.
+        has_stats = conn.execute("SELECT 1 FROM sqlite_master WHERE name='sqlite_stat1'").fetchone()
+        if has_stats:
+            _optimize(conn)
+        else:
+            conn.execute("ANALYZE")
+            conn.commit()
     finally:
         conn.close()
 
@@ -310,12 +378,253 @@ def _create_unique_fp_index(conn: sqlite3.Connection) -> bool:
         return False
 
 
+def _ensure_amount_cents(conn: sqlite3.Connection):
+    """
+    amount_cents is the exact integer mirror of amount. Adds/backfills the column on
+    older DBs and keeps it in step for writers that only set amount (grail loader,
+    staged import, manual edits). add_transactions_df writes both, so its inserts
+    never fire the UPDATE, and an amount UPDATE only rewrites the row when the value
+    actually changed.
+    """
+    cols = conn.execute("PRAGMA table_info(transactions)").fetchall()
+    if not any(r["name"] == "amount_cents" for r in cols):
+        conn.execute("ALTER TABLE transactions ADD COLUMN amount_cents INTEGER")
+    conn.execute(
+        "UPDATE transactions SET amount_cents = CAST(ROUND(amount * 100) AS INTEGER) "
+        "WHERE amount_cents IS NULL AND amount IS NOT NULL"
+    )
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_amount_cents_ins
+        AFTER INSERT ON transactions
+        WHEN NEW.amount_cents IS NULL AND NEW.amount IS NOT NULL
+        BEGIN
+            UPDATE transactions SET amount_cents = CAST(ROUND(NEW.amount * 100) AS INTEGER) WHERE id = NEW.id;
+        END
+    """)
+    # recreated so DBs carrying the earlier unconditional version pick up the WHEN
+    conn.execute("DROP TRIGGER IF EXISTS trg_transactions_amount_cents_upd")
+    conn.execute("""
+        CREATE TRIGGER trg_transactions_amount_cents_upd
+        AFTER UPDATE OF amount ON transactions
+        WHEN NEW.amount IS NOT OLD.amount
+        BEGIN
+            UPDATE transactions SET amount_cents = CAST(ROUND(NEW.amount * 100) AS INTEGER) WHERE id = NEW.id;
+        END
+    """)
+
+
+def _ensure_merchant_key(conn: sqlite3.Connection):
+    """
+    merchant_key is the persisted rule-matching key, lower(COALESCE(merchant, cleaned_description)),
+    so rule UPDATEs compare a stored column instead of re-lowering every row per rule.
+    Adds/backfills the column on older DBs and keeps it current via triggers.
+    """
+    cols = conn.execute("PRAGMA table_info(transactions)").fetchall()
+    if not any(r["name"] == "merchant_key" for r in cols):
+        conn.execute("ALTER TABLE transactions ADD COLUMN merchant_key TEXT")
+    conn.execute(
+        "UPDATE transactions SET merchant_key = lower(COALESCE(merchant, cleaned_description)) "
+        "WHERE merchant_key IS NULL AND COALESCE(merchant, cleaned_description) IS NOT NULL"
+    )
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_merchant_key_ins
+        AFTER INSERT ON transactions
+        WHEN NEW.merchant_key IS NULL AND COALESCE(NEW.merchant, NEW.cleaned_description) IS NOT NULL
+        BEGIN
+            UPDATE transactions SET merchant_key = lower(COALESCE(NEW.merchant, NEW.cleaned_description)) WHERE id = NEW.id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_merchant_key_upd
+        AFTER UPDATE OF merchant, cleaned_description ON transactions
+        BEGIN
+            UPDATE transactions SET merchant_key = lower(COALESCE(NEW.merchant, NEW.cleaned_description)) WHERE id = NEW.id;
+        END
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_txn_merchant_key ON transactions(merchant_key COLLATE NOCASE)")
+
+
+def _ensure_description_fts(conn: sqlite3.Connection):
+    """
+    transactions_fts is a trigram FTS5 index over cleaned_description (external
+    content, so no second copy of the text). Substring searches
+    (`LIKE '%term%'`, 3+ chars) resolve through it instead of scanning every row.
+    Kept current via triggers; skipped when SQLite was built without FTS5.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='transactions_fts'"
+    ).fetchone()
+    if not exists:
+        try:
+            conn.execute(
+                "CREATE VIRTUAL TABLE transactions_fts USING fts5("
+                "cleaned_description, content='transactions', content_rowid='id', tokenize='trigram')"
+            )
+        except sqlite3.OperationalError:
+            return
+        conn.execute("INSERT INTO transactions_fts(transactions_fts) VALUES('rebuild')")
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_ins
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO transactions_fts(rowid, cleaned_description) VALUES (NEW.id, NEW.cleaned_description);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_del
+        AFTER DELETE ON transactions
+        BEGIN
+            INSERT INTO transactions_fts(transactions_fts, rowid, cleaned_description) VALUES ('delete', OLD.id, OLD.cleaned_description);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_upd
+        AFTER UPDATE OF cleaned_description ON transactions
+        BEGIN
+            INSERT INTO transactions_fts(transactions_fts, rowid, cleaned_description) VALUES ('delete', OLD.id, OLD.cleaned_description);
+            INSERT INTO transactions_fts(rowid, cleaned_description) VALUES (NEW.id, NEW.cleaned_description);
+        END
+    """)
+
+
+@lru_cache(maxsize=4096)
+def _rule_matcher(pattern: Optional[str]) -> Callable[[str], bool]:
+    """
+    Compiled once per category_rules pattern: same result as
+    `merchant_key LIKE '%pattern%'`. Plain tokens (the common case) are a str
+    containment test; LIKE wildcards (%, _) become a cached regex. A NULL/blank
+    pattern matches nothing (LIKE '%' || NULL || '%' is NULL, never true).
+    """
+    p = (pattern or "").lower().strip()
+    if not p:
+        return lambda key: False
+    if "%" not in p and "_" not in p:
+        return lambda key: p in key
+    rx = re.compile(
+        "".join(".*" if ch == "%" else "." if ch == "_" else re.escape(ch) for ch in p),
+        re.DOTALL,
+    )
+    return lambda key: rx.search(key) is not None
+
+
+def _trigrams(key: str) -> set:
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+
+def _trigram_indexable(pattern: Optional[str]) -> bool:
+    p = (pattern or "").lower().strip()
+    return len(p) >= 3 and "%" not in p and "_" not in p
+
+
+# Plain-token rules scan all keys at C speed (str.find over one joined buffer), so
+# the trigram index only beats that scan for very large rule sets: on 100k rows the
+# index build (~1.4s) costs as much as ~1000 buffer scans (~1.3ms each).
+TRIGRAM_MIN_RULES = 1024
+
+
+class _RuleCandidates:
+    """
+    {id: merchant_key} rows a rule pass may touch. Plain-token rules (the common
+    case) are found with str.find over all keys joined into one NUL-separated
+    buffer; LIKE-wildcard rules use their cached matcher per key. With enough
+    plain-token rules (len >= 3) a trigram -> ids reverse index is built instead,
+    so those rules only examine rows sharing every trigram of the token.
+    Hits are always confirmed against the current key, and rows re-keyed after
+    construction are re-checked directly, so stale buffer/postings never leak.
+    `among` restricts a lookup to a subset of the ids.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, where: str, rules: Sequence[sqlite3.Row] = ()):
+        self.keys: Dict[int, str] = {
+            row["id"]: row["merchant_key"]
+            for row in conn.execute(f"SELECT id, merchant_key FROM transactions WHERE merchant_key IS NOT NULL AND ({where})")
+        }
+        self.rekeyed: set = set()
+        self.grams: Optional[Dict[str, set]] = None
+        if sum(_trigram_indexable(r["merchant_pattern"]) for r in rules) >= TRIGRAM_MIN_RULES:
+            self.grams = {}
+            for i, key in self.keys.items():
+                self._index(i, key)
+        else:
+            self._ids = list(self.keys)
+            self._text = "\0".join(self.keys.values())
+            # start offset of each key in _text, plus the end sentinel
+            self._starts = list(accumulate((len(k) + 1 for k in self.keys.values()), initial=0))
+
+    def _index(self, i: int, key: str):
+        if self.grams is None:
+            return
+        for g in _trigrams(key):
+            self.grams.setdefault(g, set()).add(i)
+
+    def _scan(self, p: str) -> List[int]:
+        """ids whose key (as of construction) contains p, one str.find per hit."""
+        text, starts, ids, out = self._text, self._starts, self._ids, []
+        pos = text.find(p)
+        while pos != -1:
+            k = bisect_right(starts, pos) - 1
+            out.append(ids[k])
+            pos = text.find(p, starts[k + 1])
+        return out
+
+    def hits(self, pattern: Optional[str], among: Optional[set] = None) -> List[int]:
+        match = _rule_matcher(pattern)
+        keys = self.keys
+        if not _trigram_indexable(pattern):
+            pool = keys if among is None else among
+            return sorted(i for i in pool if i in keys and match(keys[i]))
+        p = (pattern or "").lower().strip()
+        if self.grams is None:
+            found = self._scan(p)
+        else:
+            postings = []
+            for g in _trigrams(p):
+                ids = self.grams.get(g)
+                if not ids:
+                    postings = []
+                    break
+                postings.append(ids)
+            postings.sort(key=len)
+            found = set(postings[0]).intersection(*postings[1:]) if postings else set()
+        out = {i for i in found if i in keys and match(keys[i])}
+        out.update(i for i in self.rekeyed if i in keys and match(keys[i]))
+        if among is not None:
+            out &= among
+        return sorted(out)
+
+    def refresh(self, conn: sqlite3.Connection, ids: List[int]):
+        """Re-read merchant_key for rows a rule may have re-merchanted (trigger-maintained)."""
+        for row in conn.execute(
+            "SELECT id, merchant_key FROM transactions WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(ids),),
+        ):
+            if row["merchant_key"] is None:
+                self.keys.pop(row["id"], None)
+            elif row["merchant_key"] != self.keys.get(row["id"]):
+                self.keys[row["id"]] = row["merchant_key"]
+                self.rekeyed.add(row["id"])
+                self._index(row["id"], row["merchant_key"])
+
+
+def _cents_col(amt: pd.Series) -> pd.Series:
+    """
+    Dollars -> integer cents, rounded bit for bit like the amount_cents triggers'
+    CAST(ROUND(amount * 100) AS INTEGER): half away from zero on the float product,
+    so rows written here and rows filled in by SQLite always agree.
+    """
+    c = amt.astype(float) * 100
+    return (np.sign(c) * np.trunc(c.abs() + 0.5)).astype("int64")
+
+
+_ISO_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%d/%m/%Y", "%d/%m/%y")
+
+
 def _to_iso_date(s) -> Optional[str]:
     """Best-effort convert to YYYY-MM-DD."""
     if s is None or (isinstance(s, float) and pd.isna(s)):
         return None
     s = str(s).strip()
-    for fmt in ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%d/%m/%Y", "%d/%m/%y"):
+    for fmt in _ISO_DATE_FORMATS:
         try:
             return datetime.strptime(s, fmt).strftime("%Y-%m-%d")
         except Exception:
@@ -327,18 +636,62 @@ def _to_iso_date(s) -> Optional[str]:
         return None
 
 
+def _iso_dates(ser: pd.Series) -> pd.Series:
+    """
+    Column-wise _to_iso_date: each known format is parsed in one vectorized
+    pd.to_datetime pass (in the same priority order), and only values no format
+    accepts fall back to the per-value parser. None where unparseable.
+    """
+    if pd.api.types.is_datetime64_any_dtype(ser):
+        return ser.dt.strftime("%Y-%m-%d").astype(object).where(ser.notna(), None)
+    txt = ser.astype("string").str.strip()
+    parsed = pd.Series(pd.NaT, index=ser.index, dtype="datetime64[ns]")
+    for fmt in _ISO_DATE_FORMATS:
+        todo = parsed.isna() & txt.notna()
+        if not todo.any():
+            break
+        parsed[todo] = pd.to_datetime(txt[todo], format=fmt, errors="coerce")
+    iso = parsed.dt.strftime("%Y-%m-%d").astype(object).where(parsed.notna(), None)
+    rest = iso.isna() & txt.notna() & (txt != "")
+    if rest.any():
+        iso[rest] = txt[rest].astype(object).map(_to_iso_date)
+    return iso
+
+
 def _fingerprint(account_id: int, date_s: str, desc: str, amount: float) -> str:
     """
     Global fingerprint: account|ISO date|amount|normalized_event.
     IMPORTANT: pass a COMBINED description (original + cleaned) so reimports
     with slightly different text still collide.
+    The amount part is f'{amount:.2f}' of the float itself, never amount_cents:
+    that text is what every stored fingerprint was built from, and its rounding
+    (exact binary value: 2.675 -> '2.67') differs from integer-cent rounding.
     """
     iso = _to_iso_date(date_s) or (str(date_s) if date_s else "")
     event = _normalized_event_for_fp(desc)
-    basis = f"{account_id}|{iso}|{amount:.2f}|{event}"
+    basis = f"{account_id}|{iso}|{float(amount):.2f}|{event}"
     return hashlib.sha1(basis.encode("utf-8")).hexdigest()[:24]
 
 
+def _fingerprints(account_id: int, iso_dates: List[str], descs: List[str], amounts: List[float]) -> List[str]:
+    """
+    Batch _fingerprint for one account with dates ALREADY in ISO form (skips the
+    per-row date re-parse). Amount text is formatted column-wise and normalized
+    events are memoized within the batch since recurring merchants repeat the same
+    text, so the per-row loop is just string join + sha1. Output is identical to _fingerprint.
+    """
+    events: Dict[str, str] = {}
+    for desc in descs:
+        if desc not in events:
+            events[desc] = _normalized_event_for_fp(desc)
+    prefix = f"{account_id}|"
+    sha1 = hashlib.sha1
+    return [
+        sha1(f"{prefix}{iso}|{amt}|{events[desc]}".encode("utf-8")).hexdigest()[:24]
+        for iso, amt, desc in zip(iso_dates, np.char.mod("%.2f", np.asarray(amounts, dtype=float)).tolist(), descs)
+    ]
+
+
 # Normalize signs: credits positive by keywords; otherwise assume expenses negative.
 CREDIT_KEYWORDS = (
     "payment", "thank you", "refund", "reversal", "credit", "deposit",
@@ -370,27 +723,53 @@ def _as_text(v) -> str:
         return " ".join(str(x) for x in v if x is not None).strip()
     return str(v).strip()
 
+def _arrow_text(ser: Optional[pd.Series], n: int) -> pa.Array:
+    """Text column -> Arrow UTF-8 array with nulls as "" (no per-row PyObject strings)."""
+    if ser is None:
+        return pa.array([""] * n, type=pa.string())
+    try:
+        arr = pa.array(ser, type=pa.string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        arr = pa.array(ser.astype(str), type=pa.string())
+    return pc.fill_null(arr, "")
+
+
+def _text_col(df: pd.DataFrame, *names: str) -> pd.Series:
+    """
+    Column-wise _as_text: first non-blank of the given columns, stripped, "" when
+    none is present. Plain string columns stay in pandas' vectorized str ops; only
+    mixed object columns (lists/tuples) fall back to _as_text per cell.
+    """
+    out = pd.Series("", index=df.index, dtype=object)
+    for name in names:
+        if name not in df.columns:
+            continue
+        ser = df[name]
+        if pd.api.types.infer_dtype(ser, skipna=True) in ("string", "empty", "integer", "floating", "mixed-integer-float"):
+            txt = ser.astype("string").str.strip().fillna("").astype(object)
+        else:
+            txt = ser.map(_as_text)
+        out = out.where(out != "", txt)
+    return out
+
+
 def _apply_signs(df: pd.DataFrame) -> pd.DataFrame:
     """
     Normalize signs: credits positive by keywords; otherwise assume expenses negative.
     NOTE: Use BOTH cleaned_description and original_description so 'direct deposit'
     in the raw text is always detected even if cleaned text lost the keyword.
+    Returns a new frame with amount/amount_cents replaced; the text columns are
+    never copied.
     """
-    df = df.copy()
-
-    # Build a combined description field (cleaned + original) for robust keyword matching
-    desc_clean = df.get("cleaned_description")
-    desc_orig  = df.get("original_description")
-    if desc_clean is None:
-        desc_clean = pd.Series([""] * len(df), index=df.index)
-    else:
-        desc_clean = desc_clean.astype(str)
-    if desc_orig is None:
-        desc_orig = pd.Series([""] * len(df), index=df.index)
-    else:
-        desc_orig = desc_orig.astype(str)
-
-    desc = (desc_clean.fillna("") + " " + desc_orig.fillna("")).str.lower()
+    # Build a combined description field (cleaned + original) for robust keyword matching,
+    # entirely in Arrow string kernels (contiguous UTF-8 buffers).
+    desc = pc.utf8_lower(
+        pc.binary_join_element_wise(
+            _arrow_text(df.get("cleaned_description"), len(df)),
+            _arrow_text(df.get("original_description"), len(df)),
+            " ",
+        )
+    )
 
     amt = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0)
 
@@ -398,10 +777,12 @@ def _apply_signs(df: pd.DataFrame) -> pd.DataFrame:
     extra_credit = {"payroll", "ach credit", "zelle from", "incoming"}
     credit_terms = set(CREDIT_KEYWORDS) | extra_credit
 
-    credit_mask = pd.Series(False, index=df.index)
-    for kw in credit_terms:
-        if kw:
-            credit_mask = credit_mask | desc.str.contains(re.escape(kw))
+    # One regex pass over the column instead of one scan per keyword
+    pattern = "|".join(re.escape(kw) for kw in sorted(credit_terms) if kw)
+    credit_mask = pd.Series(
+        pc.match_substring_regex(desc, pattern).to_numpy(zero_copy_only=False),
+        index=df.index,
+    )
 
     # Force credited items positive
     amt = amt.where(~credit_mask, amt.abs())
@@ -411,8 +792,10 @@ def _apply_signs(df: pd.DataFrame) -> pd.DataFrame:
     if len(non_credit) and (non_credit > 0).mean() >= 0.5:
         amt = amt.where(credit_mask, -amt.abs())
 
-    df["amount"] = amt.astype(float)
-    return df
+    return df.assign(
+        amount=amt.astype(float),
+        amount_cents=_cents_col(amt),
+    )
 
 def _caps(s: Optional[str]) -> Optional[str]:
     """Uppercase helper that keeps None as None."""
@@ -429,18 +812,17 @@ def normalize_all_transaction_dates(conn: sqlite3.Connection | None = None) -> d
         own = True
     try:
         rows = conn.execute("SELECT id, transaction_date FROM transactions").fetchall()
-        changed = bad = 0
-        for r in rows:
-            raw = r["transaction_date"]
-            iso = _to_iso_date(raw)
-            if not iso:
-                bad += 1
-                continue
-            if iso != raw:
-                conn.execute("UPDATE transactions SET transaction_date=? WHERE id=?", (iso, r["id"]))
-                changed += 1
+        ids = [r["id"] for r in rows]
+        raw = pd.Series([r["transaction_date"] for r in rows], dtype=object)
+        iso = _iso_dates(raw)
+        bad = int(iso.isna().sum())
+        fix = iso.notna() & (iso != raw)
+        conn.executemany(
+            "UPDATE transactions SET transaction_date=? WHERE id=?",
+            zip(iso[fix].tolist(), [ids[i] for i in fix[fix].index]),
+        )
         conn.commit()
-        return {"changed": changed, "bad": bad, "total": len(rows)}
+        return {"changed": int(fix.sum()), "bad": bad, "total": len(rows)}
     finally:
         if own:
             conn.close()
@@ -464,6 +846,8 @@ _RE_PUNCT = re.compile(r"[^\w\s&'\.-]+")
 _RE_DIGITS = re.compile(r"\b\d{2,}\b")
 _RE_STATES = re.compile(r"\b(AL|AK|AS|AZ|AR|CA|CO|CT|DC|DE|FL|GA|GU|HI|IA|ID|IL|IN|KS|KY|LA|MA|MD|ME|MI|MN|MO|MP|MS|MT|NC|ND|NE|NH|NJ|NM|NV|NY|OH|OK|OR|PA|PR|RI|SC|SD|TN|TX|UM|UT|VA|VI|VT|WA|WI|WV|WY)\b", re.I)
 
+_CANON_PROBE = re.compile("|".join(re.escape(k) for k in _CANON))
+
 def _merchant_from_desc(text: str) -> str:
     s = (text or "").strip().lower()
     if not s:
@@ -472,14 +856,35 @@ def _merchant_from_desc(text: str) -> str:
     s = _RE_DIGITS.sub(" ", s)
     s = _RE_STATES.sub(" ", s)
     s = _RE_MULTI_WS.sub(" ", s).strip()
-    for key, canon in _CANON.items():
-        if key in s:
-            return canon
+    # One alternation scan decides whether any canonical key occurs at all; the
+    # ordered loop (first key wins) only runs for the rows that do contain one.
+    if _CANON_PROBE.search(s):
+        for key, canon in _CANON.items():
+            if key in s:
+                return canon
     tokens = s.split()
     if len(tokens) > 5:
         s = " ".join(tokens[:5])
     return s.title()
 
+# Union of the extractors' entry gates (extract_zelle_to_from needs "zelle",
+# extract_to_from_party a transfer/payment word): rows matching neither skip both.
+_P2P_XFER_PROBE = re.compile(r"(?i)zelle|\b(?:transfer|payment|pmt|xfer)\b")
+
+def _merchant_guesses(descs: List[str], cleans: List[str]) -> List[str]:
+    """
+    Batch merchant fallback for rows without one: Zelle/transfer extractors on the
+    combined text, else the description heuristic. Plain lists keep the loop free
+    of pandas scalar boxing; one probe regex routes each row so ordinary card
+    purchases never enter the extractors.
+    """
+    zelle, xfer, heur = extract_zelle_to_from, extract_to_from_party, _merchant_from_desc
+    probe = _P2P_XFER_PROBE.search
+    return [
+        ((zelle(d) or xfer(d)) if probe(d) else None) or heur(c) or ""
+        for d, c in zip(descs, cleans)
+    ]
+
 def rebuild_fingerprints_and_dedupe(dry_run: bool = False) -> dict:
     """
     Recompute per-row unique_fingerprint for all transactions and delete duplicates.
@@ -616,6 +1021,7 @@ def rebuild_fingerprints_and_dedupe(dry_run: bool = False) -> dict:
 
     # Summary when dry-run
     if dry_run:
+        conn.close()
         return {
             "dry_run": True,
             "impl": "rebuild_fingerprints_v4",
@@ -631,35 +1037,45 @@ def rebuild_fingerprints_and_dedupe(dry_run: bool = False) -> dict:
     try:
         conn.execute("BEGIN")
 
+        # Each phase is ONE statement bound to a JSON array (json_each), instead of
+        # an executemany that re-binds and steps the statement once per row.
+
         # 1) Delete all losers first (eliminates any immediate UNIQUE collisions)
         if rows_to_delete:
-            conn.executemany(
-                "DELETE FROM transactions WHERE id=?",
-                [(rid,) for rid in rows_to_delete],
+            conn.execute(
+                "DELETE FROM transactions WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(rows_to_delete),),
             )
             rows_deleted = len(rows_to_delete)
 
-        # 2) Stage winners that will change to unique placeholder values
         if winners_to_change:
-            conn.executemany(
-                "UPDATE transactions SET unique_fingerprint=? WHERE id=?",
-                [(f"__stage__{rid}__", rid) for (rid, _new_fp) in winners_to_change],
+            payload = json.dumps([{"id": rid, "fp": new_fp} for (rid, new_fp) in winners_to_change])
+
+            # 2) Stage winners that will change to unique placeholder values
+            conn.execute(
+                "UPDATE transactions SET unique_fingerprint = '__stage__' || id || '__' "
+                "WHERE id IN (SELECT json_extract(value, '$.id') FROM json_each(?))",
+                (payload,),
             )
 
-        # 3) Set final fingerprints on winners
-        if winners_to_change:
-            conn.executemany(
-                "UPDATE transactions SET unique_fingerprint=? WHERE id=?",
-                [(new_fp, rid) for (rid, new_fp) in winners_to_change],
+            # 3) Set final fingerprints on winners
+            conn.execute(
+                "UPDATE transactions SET unique_fingerprint = j.fp "
+                "FROM (SELECT json_extract(value, '$.id') AS id, json_extract(value, '$.fp') AS fp "
+                "      FROM json_each(?)) AS j "
+                "WHERE transactions.id = j.id",
+                (payload,),
             )
 
         conn.commit()
+        _optimize(conn)
     except Exception:
         conn.rollback()
         raise
     finally:
         # Re-check whether the unique index is present (for completeness)
         index_present = _index_on_unique_fingerprint_exists(conn)
+        conn.close()
 
     return {
         "dry_run": False,
@@ -700,7 +1116,7 @@ def list_accounts() -> List[Dict]:
 # Rules application
 # -------------------------------------------------------------------
 
-def apply_rules_to_ai_fields(conn: Optional[sqlite3.Connection] = None):
+def apply_rules_to_ai_fields(conn: Optional[sqlite3.Connection] = None, _cands: Optional[_RuleCandidates] = None):
     own = False
     if conn is None:
         conn = get_db_connection()
@@ -711,17 +1127,31 @@ def apply_rules_to_ai_fields(conn: Optional[sqlite3.Connection] = None):
             "FROM category_rules"
         ).fetchall()
 
+        # Candidate keys pulled once and matched in Python with one cached matcher
+        # per rule; only rules that hit anything reach SQLite. apply_category_rules
+        # passes in its own (all-rows) candidates so the keys are read only once.
+        ai_where = "ai_category IS NULL OR ai_category=''"
+        if _cands is None:
+            cands = _RuleCandidates(conn, ai_where, rules)
+            open_ids = set(cands.keys)
+        else:
+            cands = _cands
+            open_ids = {row[0] for row in conn.execute(f"SELECT id FROM transactions WHERE {ai_where}")}
+
         for r in rules:
-            pat = f"%{(r['merchant_pattern'] or '').lower().strip()}%"
-                        # if rule has a canonical merchant, fill it only if current merchant is null/empty
+            ids = cands.hits(r["merchant_pattern"], open_ids)
+            if not ids:
+                continue
+            where, ids_json = "id IN (SELECT value FROM json_each(?))", json.dumps(ids)
+            # if rule has a canonical merchant, fill it only if current merchant is null/empty
             if r["subcategory"]:
                 conn.execute(
                     "UPDATE transactions "
                     "SET ai_category=?, ai_subcategory=?, "
                     "    merchant = CASE WHEN (merchant IS NULL OR TRIM(merchant)='') AND ? IS NOT NULL THEN UPPER(?) ELSE merchant END "
                     "WHERE (ai_category IS NULL OR ai_category='') "
-                    "  AND lower(COALESCE(merchant, cleaned_description)) LIKE ?",
-                    (r["category"], r["subcategory"], r["merchant_canonical"], r["merchant_canonical"], pat)
+                    f"  AND {where}",
+                    (r["category"], r["subcategory"], r["merchant_canonical"], r["merchant_canonical"], ids_json)
                 )
             else:
                 conn.execute(
@@ -729,9 +1159,13 @@ def apply_rules_to_ai_fields(conn: Optional[sqlite3.Connection] = None):
                     "SET ai_category=?, "
                     "    merchant = CASE WHEN (merchant IS NULL OR TRIM(merchant)='') AND ? IS NOT NULL THEN UPPER(?) ELSE merchant END "
                     "WHERE (ai_category IS NULL OR ai_category='') "
-                    "  AND lower(COALESCE(merchant, cleaned_description)) LIKE ?",
-                    (r["category"], r["merchant_canonical"], r["merchant_canonical"], pat)
+                    f"  AND {where}",
+                    (r["category"], r["merchant_canonical"], r["merchant_canonical"], ids_json)
                 )
+            if r["category"]:
+                open_ids.difference_update(ids)
+            if r["merchant_canonical"] is not None:
+                cands.refresh(conn, ids)
         conn.commit()
     finally:
         if own:
@@ -749,16 +1183,22 @@ def apply_category_rules(conn: Optional[sqlite3.Connection] = None, overwrite: b
         conn = get_db_connection()
         own = True
     try:
-        # always ensure ai_* are filled as well
-        apply_rules_to_ai_fields(conn)
-
         rules = conn.execute(
             "SELECT merchant_pattern, category, COALESCE(subcategory,'') AS subcategory, merchant_canonical "
             "FROM category_rules"
         ).fetchall()
 
+        # one candidate set (and trigram index, if any) shared by both passes
+        cands = _RuleCandidates(conn, "1=1", rules)
+
+        # always ensure ai_* are filled as well
+        apply_rules_to_ai_fields(conn, cands)
+
         for r in rules:
-            pat = f"%{(r['merchant_pattern'] or '').lower().strip()}%"
+            ids = cands.hits(r["merchant_pattern"])
+            if not ids:
+                continue
+            where, ids_json = "id IN (SELECT value FROM json_each(?))", json.dumps(ids)
             cat, sub, mcanon = r["category"], (r["subcategory"] or None), (r["merchant_canonical"] or None)
 
             if overwrite:
@@ -766,35 +1206,37 @@ def apply_category_rules(conn: Optional[sqlite3.Connection] = None, overwrite: b
                     conn.execute(
                         "UPDATE transactions "
                         "SET category=?, subcategory=?, merchant=COALESCE(UPPER(?), merchant) "
-                        "WHERE lower(COALESCE(merchant, cleaned_description)) LIKE ?",
-                        (cat, sub, mcanon, pat)
+                        f"WHERE {where}",
+                        (cat, sub, mcanon, ids_json)
                     )
                 else:
                     conn.execute(
                         "UPDATE transactions "
                         "SET category=?, merchant=COALESCE(UPPER(?), merchant) "
-                        "WHERE lower(COALESCE(merchant, cleaned_description)) LIKE ?",
-                        (cat, mcanon, pat)
+                        f"WHERE {where}",
+                        (cat, mcanon, ids_json)
                     )
 
-        else:
-            if sub is not None:
-                conn.execute(
-                    "UPDATE transactions "
-                    "SET category=CASE WHEN (category IS NULL OR category='' OR category='Uncategorized') THEN ? ELSE category END, "
-                    "    subcategory=CASE WHEN (subcategory IS NULL OR subcategory='') THEN ? ELSE subcategory END, "
-                    "    merchant=CASE WHEN (merchant IS NULL OR TRIM(merchant)='') AND ? IS NOT NULL THEN UPPER(?) ELSE merchant END "
-                    "WHERE lower(COALESCE(merchant, cleaned_description)) LIKE ?",
-                    (cat, sub, mcanon, mcanon, pat)
-                )
             else:
-                conn.execute(
-                    "UPDATE transactions "
-                    "SET category=CASE WHEN (category IS NULL OR category='' OR category='Uncategorized') THEN ? ELSE category END, "
-                    "    merchant=CASE WHEN (merchant IS NULL OR TRIM(merchant)='') AND ? IS NOT NULL THEN UPPER(?) ELSE merchant END "
-                    "WHERE lower(COALESCE(merchant, cleaned_description)) LIKE ?",
-                    (cat, mcanon, mcanon, pat)
-                )
+                if sub is not None:
+                    conn.execute(
+                        "UPDATE transactions "
+                        "SET category=CASE WHEN (category IS NULL OR category='' OR category='Uncategorized') THEN ? ELSE category END, "
+                        "    subcategory=CASE WHEN (subcategory IS NULL OR subcategory='') THEN ? ELSE subcategory END, "
+                        "    merchant=CASE WHEN (merchant IS NULL OR TRIM(merchant)='') AND ? IS NOT NULL THEN UPPER(?) ELSE merchant END "
+                        f"WHERE {where}",
+                        (cat, sub, mcanon, mcanon, ids_json)
+                    )
+                else:
+                    conn.execute(
+                        "UPDATE transactions "
+                        "SET category=CASE WHEN (category IS NULL OR category='' OR category='Uncategorized') THEN ? ELSE category END, "
+                        "    merchant=CASE WHEN (merchant IS NULL OR TRIM(merchant)='') AND ? IS NOT NULL THEN UPPER(?) ELSE merchant END "
+                        f"WHERE {where}",
+                        (cat, mcanon, mcanon, ids_json)
+                    )
+            if mcanon is not None:
+                cands.refresh(conn, ids)
         conn.commit()
     finally:
         if own:
@@ -808,46 +1250,65 @@ def autofill_subcategory_for_tx(transaction_id: str, category: Optional[str] = N
       rule: (merchant_pattern, category) -> subcategory
     Returns the subcategory that was applied (or None if no match).
     """
-    conn = get_db_connection()
-    try:
-        tx = conn.execute(
-            "SELECT merchant, cleaned_description, category, ai_category FROM transactions WHERE transaction_id=?",
-            (str(transaction_id),)
-        ).fetchone()
-        if not tx:
-            return None
+    return autofill_subcategory_for_txids([transaction_id], category).get(str(transaction_id))
 
-        chosen_category = (category or tx["category"] or tx["ai_category"] or "").strip()
-        if not chosen_category:
-            return None
 
-        merchant_text = (tx["merchant"] or tx["cleaned_description"] or "").strip().lower()
-        if not merchant_text:
-            return None
+def autofill_subcategory_for_txids(transaction_ids: List[str], category: Optional[str] = None) -> Dict[str, str]:
+    """
+    Batch autofill_subcategory_for_tx: rules are read once, the strongest (longest)
+    matching pattern is resolved once per distinct (merchant text, category) pair,
+    and all rows are written with one executemany.
+    Returns {transaction_id: subcategory applied}.
+    """
+    txids = [str(t) for t in transaction_ids]
+    if not txids:
+        return {}
+    conn = get_db_connection()
+    try:
+        # category -> [(pattern, subcategory, merchant_canonical)], longest pattern first
+        rules_by_cat: Dict[str, List[Tuple[str, str, Optional[str]]]] = {}
+        for r in conn.execute(
+            "SELECT merchant_pattern, category, subcategory, merchant_canonical FROM category_rules "
+            "WHERE subcategory IS NOT NULL ORDER BY LENGTH(merchant_pattern) DESC"
+        ):
+            if not (r["merchant_pattern"] or "").strip():
+                continue
+            rules_by_cat.setdefault(r["category"], []).append(
+                (r["merchant_pattern"], r["subcategory"], r["merchant_canonical"])
+            )
 
-        # Strict match: same merchant pattern AND same category; take the strongest (longest) pattern first
-        rule = conn.execute(
-            """
-            SELECT category, subcategory, merchant_canonical
-            FROM category_rules
-            WHERE subcategory IS NOT NULL
-              AND ? LIKE '%' || merchant_pattern || '%'
-              AND category = ?
-            ORDER BY LENGTH(merchant_pattern) DESC
-            LIMIT 1
-            """,
-            (merchant_text, chosen_category)
-        ).fetchone()
+        best: Dict[Tuple[str, str], Optional[Tuple[str, str, Optional[str]]]] = {}
 
-        if not rule:
-            return None
+        def _best_rule(text: str, cat: str):
+            key = (text, cat)
+            if key not in best:
+                best[key] = next(
+                    (rule for rule in rules_by_cat.get(cat, ()) if _rule_matcher(rule[0])(text)), None
+                )
+            return best[key]
+
+        applied: Dict[str, str] = {}
+        updates: List[Tuple] = []
+        for tx in conn.execute(
+            "SELECT transaction_id, merchant, cleaned_description, category, ai_category FROM transactions "
+            "WHERE transaction_id IN (SELECT value FROM json_each(?))",
+            (json.dumps(txids),),
+        ):
+            chosen_category = (category or tx["category"] or tx["ai_category"] or "").strip()
+            merchant_text = (tx["merchant"] or tx["cleaned_description"] or "").strip().lower()
+            if not chosen_category or not merchant_text:
+                continue
 
-        sub = (rule["subcategory"] or "").strip()
-        if not sub:
-            return None
+            # Strict match: same merchant pattern AND same category
+            rule = _best_rule(merchant_text, chosen_category)
+            sub = (rule[1] or "").strip() if rule else ""
+            if not sub:
+                continue
+            applied[tx["transaction_id"]] = sub
+            updates.append((sub, rule[2], rule[2], tx["transaction_id"]))
 
         # Apply subcategory; also backfill merchant if empty
-        conn.execute(
+        conn.executemany(
             """
             UPDATE transactions
             SET subcategory = ?,
@@ -858,10 +1319,10 @@ def autofill_subcategory_for_tx(transaction_id: str, category: Optional[str] = N
                             END
             WHERE transaction_id = ?
             """,
-            (sub, rule["merchant_canonical"], rule["merchant_canonical"], str(transaction_id))
+            updates,
         )
         conn.commit()
-        return sub
+        return applied
     finally:
         conn.close()
 
@@ -895,97 +1356,92 @@ def add_transactions_df(df: pd.DataFrame, account_name: str) -> Tuple[int, int]:
     try:
         account_id = get_or_create_account(conn, account_name)
 
-        # Current max numeric transaction_id (we own this space)
+        # One write transaction for the whole import: a single WAL commit instead
+        # of a journal sync per row; IMMEDIATE takes the write lock up front.
+        conn.execute("BEGIN IMMEDIATE")
+
+        # Current max numeric transaction_id (we own this space); the expression
+        # matches ix_txn_txid_int exactly, so this is an index seek, not a scan
         row = conn.execute(
             """
             SELECT COALESCE(MAX(CAST(transaction_id AS INTEGER)), 0) AS max_id
             FROM transactions
-            WHERE TRIM(COALESCE(transaction_id,'')) != ''
-              AND transaction_id GLOB '[0-9]*'
+            WHERE transaction_id GLOB '[0-9]*'
             """
         ).fetchone()
         next_txid = int(row["max_id"] or 0) + 1
 
-        added = skipped = 0
-
         sql = (
             "INSERT OR IGNORE INTO transactions "
             "(transaction_id, transaction_date, account_id, "
-            " original_description, cleaned_description, merchant, amount, "
-            " ai_category, ai_subcategory, category, subcategory, unique_fingerprint) "
-            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, NULL, ?)"
+            " original_description, cleaned_description, merchant, amount, amount_cents, "
+            " ai_category, ai_subcategory, category, subcategory, unique_fingerprint, merchant_key) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, NULL, ?, lower(COALESCE(?, ?)))"
         )
 
-        for r in df.to_dict(orient="records"):
-            tdate = _to_iso_date(r.get("transaction_date"))
-            if not tdate:
-                skipped += 1
-                continue
-
-            try:
-                amt = float(r.get("amount"))
-            except Exception:
-                skipped += 1
-                continue
-
-            # RAW (import-only / dedupe-only) and CLEAN (business-facing) text
-            orig  = _as_text(r.get("original_description") or r.get("description"))
-            clean = _as_text(r.get("cleaned_description") or orig)
-
-            # OUR transaction id: prefer provided numeric-ish id; otherwise allocate next numeric id
-            txid = _as_text(
-                r.get("transaction_id")
-                or r.get("Transaction ID")
-                or r.get("ID")
-                or r.get("id")
-            )
-            if not txid:
-                txid = str(next_txid)
-                next_txid += 1
-
-            # Suggestions (optional)
-            ai_cat = _as_text(r.get("ai_category") or r.get("category")) or None
-            ai_sub = _as_text(r.get("ai_subcategory") or r.get("ai_sub")) or None
-
-            # Merchant: keep your existing logic (Zelle/transfer extract, else heuristic)
-            desc_for_extract = f"{orig} {clean}".strip()
-            zelle_pick = extract_zelle_to_from(desc_for_extract)
-            xfer_pick  = extract_to_from_party(desc_for_extract)
-
-            mer = (r.get("merchant") or "").strip()
-            if not mer:
-                mer = zelle_pick or xfer_pick or _merchant_from_desc(clean) or ""
-
-            # Never persist literal 'Unknown'
-            if mer:
-                s = mer.strip().strip('"').strip("'")
-                mer = None if (not s or s.lower() == "unknown") else s
-            else:
-                mer = None
-
-            # Store business-facing text in uppercase (keeps UI consistent)
-            clean_to_store = (clean or "").upper()
-            mer_to_store   = _caps(mer)
-
-            # DEDUPE KEY: use the RAWEST text we have (orig preferred) + account + date + amount
-            desc_for_fp = orig or clean
-            desc_for_extract = f"{orig} {clean}".strip()
-            fp = _fingerprint(account_id, tdate, desc_for_extract, amt)
-
+        # Column-wise preprocessing; rows without a parseable date are skipped
+        tdate = _iso_dates(df["transaction_date"]) if "transaction_date" in df.columns else pd.Series(None, index=df.index)
+        keep = tdate.notna()
+        skipped = int((~keep).sum())
+        df, tdate = df[keep], tdate[keep]
+        if df.empty:
+            conn.commit()
+            return 0, skipped
+
+        # RAW (import-only / dedupe-only) and CLEAN (business-facing) text
+        orig = _text_col(df, "original_description", "description")
+        clean = _text_col(df, "cleaned_description")
+        clean = clean.where(clean != "", orig)
+
+        # OUR transaction id: prefer provided numeric-ish id; otherwise allocate next numeric id
+        txid = _text_col(df, "transaction_id", "Transaction ID", "ID", "id")
+        missing = txid == ""
+        if missing.any():
+            txid[missing] = [str(i) for i in range(next_txid, next_txid + int(missing.sum()))]
+
+        # Suggestions (optional)
+        ai_cat = _text_col(df, "ai_category", "category")
+        ai_sub = _text_col(df, "ai_subcategory", "ai_sub")
+        ai_cat, ai_sub = ai_cat.where(ai_cat != "", None), ai_sub.where(ai_sub != "", None)
+
+        # Merchant: keep your existing logic (Zelle/transfer extract, else heuristic)
+        desc_for_extract = (orig + " " + clean).str.strip()
+        mer = _text_col(df, "merchant")
+        need = mer == ""
+        if need.any():
+            mer[need] = _merchant_guesses(desc_for_extract[need].tolist(), clean[need].tolist())
+
+        # Never persist literal 'Unknown'; store business-facing text in uppercase
+        mer = mer.str.strip().str.strip('"').str.strip("'")
+        mer = mer.where((mer != "") & (mer.str.lower() != "unknown"), "").str.strip().str.upper()
+        mer_to_store = mer.where(mer != "", None)
+        clean_to_store = clean.str.upper()
+
+        amt = df["amount"].astype(float)
+
+        # DEDUPE KEY: account + date + amount + combined RAW/CLEAN text
+        fps = _fingerprints(account_id, tdate.tolist(), desc_for_extract.tolist(), amt.tolist())
+
+        # Positional tuples zipped straight from the column arrays (.tolist() yields
+        # native Python scalars SQLite can bind); no per-row dict or frame copy.
+        mer_list, clean_list = mer_to_store.tolist(), clean_to_store.tolist()
+        rows = zip(
+            txid.tolist(), tdate.tolist(), repeat(account_id),
+            orig.tolist(), clean_list, mer_list,
+            amt.tolist(), df["amount_cents"].tolist(),
+            ai_cat.tolist(), ai_sub.tolist(), fps,
+            mer_list, clean_list,
+        )
+        cur = conn.executemany(sql, rows)
 
-            cur = conn.execute(
-                sql,
-                (txid, tdate, account_id, orig, clean_to_store, mer_to_store, amt, ai_cat, ai_sub, fp),
-            )
-            if cur.rowcount == 1:
-                added += 1
-            else:
-                # Duplicate (same fingerprint) — ignore silently
-                skipped += 1
+        # Duplicates (same fingerprint) are ignored silently and counted as skipped
+        added = max(cur.rowcount, 0)
+        skipped += len(fps) - added
 
         # Fill ai_* suggestions via rules for any remaining blanks
         apply_rules_to_ai_fields(conn)
         conn.commit()
+        _optimize(conn)
         return added, skipped
     finally:
         conn.close()
@@ -1002,7 +1458,12 @@ def import_corrections_from_rows(conn: sqlite3.Connection, rows: List[Dict]) ->
       - (optionally) description/original_description to form a new rule key if you prefer that
     Writes finals into transactions and upserts a category_rule using new_description as key.
     """
-    updated = sk = 0
+    def _val(v) -> Optional[str]:
+        return str(v).strip() if v else None
+
+    rule_rows: List[Tuple] = []
+    update_rows: List[Tuple] = []
+    sk = 0
     for r in rows:
         txid = r.get("transaction_id") or r.get("Transaction ID") or r.get("ID") or r.get("id")
         if txid in (None, ""):
@@ -1010,44 +1471,40 @@ def import_corrections_from_rows(conn: sqlite3.Connection, rows: List[Dict]) ->
             continue
         txid = str(txid).strip()
 
-        new_cat = r.get("new_category")
+        new_cat = _val(r.get("new_category"))
         # Accept a few common header variants for subcategory
-        new_sub = (
+        new_sub = _val(
             r.get("Sub_category")
             or r.get("sub_category")
             or r.get("sub category")
             or r.get("Sub Category")
             or r.get("Sub-Category")
         )
-        new_mer = r.get("new_description")
+        new_mer = _val(r.get("new_description"))
 
         # 1) Learn/refresh a rule if we have merchant + category
-        if new_mer and new_cat:
-            conn.execute(
-                "INSERT OR REPLACE INTO category_rules(merchant_pattern, category, subcategory, merchant_canonical) "
-                "VALUES (?,?,?,?)",
-                (str(new_mer).lower().strip()[:64], str(new_cat).strip(), (str(new_sub).strip() or None), str(new_mer).strip()),
-            )
+        if new_mer is not None and new_cat is not None:
+            rule_rows.append((new_mer.lower()[:64], new_cat, new_sub or None, new_mer))
 
-        # 2) Update finals on the row
-        sets, args = [], []
-        if new_cat:
-            sets.append("category=?")
-            args.append(str(new_cat).strip())
-        if new_sub:
-            sets.append("subcategory=?")
-            args.append(str(new_sub).strip())
-        if new_mer:
-            sets.append("merchant=?")
-            args.append(str(new_mer).strip())
-
-        if not sets:
+        # 2) Update finals on the row (None keeps the current value)
+        if new_cat is None and new_sub is None and new_mer is None:
             sk += 1
             continue
+        update_rows.append((new_cat, new_sub, new_mer, txid))
 
-        args.append(txid)
-        cur = conn.execute(f"UPDATE transactions SET {', '.join(sets)} WHERE transaction_id=?", args)
-        updated += int(cur.rowcount == 1)
+    # Two prepared statements for the whole sheet instead of 2 per row
+    conn.executemany(
+        "INSERT OR REPLACE INTO category_rules(merchant_pattern, category, subcategory, merchant_canonical) "
+        "VALUES (?,?,?,?)",
+        rule_rows,
+    )
+    cur = conn.executemany(
+        "UPDATE transactions "
+        "SET category=COALESCE(?, category), subcategory=COALESCE(?, subcategory), merchant=COALESCE(?, merchant) "
+        "WHERE transaction_id=?",
+        update_rows,
+    )
+    updated = max(cur.rowcount, 0)
 
     conn.commit()
     return updated, sk
@@ -1057,11 +1514,12 @@ def import_corrections_from_rows(conn: sqlite3.Connection, rows: List[Dict]) ->
 # Queries / updates
 # -------------------------------------------------------------------
 
-def fetch_transactions(
+def iter_transactions(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     account_id: Optional[int] = None,
-) -> List[Dict]:
+) -> Iterator[Dict]:
+    """Stream fetch_transactions rows one dict at a time (no full-result materialization)."""
     conn = get_db_connection()
     try:
         q = (
@@ -1079,11 +1537,20 @@ def fetch_transactions(
             q += " AND t.account_id = ?"
             args.append(account_id)
         q += " ORDER BY t.transaction_date DESC, t.id DESC"
-        return [dict(r) for r in conn.execute(q, args).fetchall()]
+        for r in conn.execute(q, args):
+            yield dict(r)
     finally:
         conn.close()
 
 
+def fetch_transactions(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    account_id: Optional[int] = None,
+) -> List[Dict]:
+    return list(iter_transactions(start_date, end_date, account_id))
+
+
 def fetch_summary(start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict:
     """
     Top-line P&L:
@@ -1102,17 +1569,16 @@ def fetch_summary(start_date: Optional[str] = None, end_date: Optional[str] = No
             base += " AND transaction_date <= ?"
             args.append(end_date)
 
-        # True income: only the 'Income' category (credits/other positives excluded)
-        income = conn.execute(
-            f"SELECT COALESCE(SUM(amount),0) {base} AND category = 'Income'"
-            , args
-        ).fetchone()[0] or 0.0
-
-        # Expenses remain all negatives
-        expenses = conn.execute(
-            f"SELECT COALESCE(SUM(amount),0) {base} AND amount < 0"
-            , args
-        ).fetchone()[0] or 0.0
+        # One pass, two conditional sums:
+        #   true income = only the 'Income' category (credits/other positives excluded)
+        #   expenses    = all negatives
+        row = conn.execute(
+            "SELECT COALESCE(SUM(CASE WHEN category = 'Income' THEN amount END),0) AS income, "
+            f"       COALESCE(SUM(CASE WHEN amount < 0 THEN amount END),0) AS expenses {base}",
+            args,
+        ).fetchone()
+        income = row["income"] or 0.0
+        expenses = row["expenses"] or 0.0
 
         return {"income": float(income), "expenses": float(expenses), "balance": float(income + expenses)}
     finally:
@@ -1251,10 +1717,19 @@ def estimate_budgets_from_history(months: int = 3) -> Dict[str, float]:
 
 
 def _month_bounds(ym: str) -> Tuple[str, str]:
-    start = f"{ym}-01"
-    dt = datetime.strptime(start, "%Y-%m-%d").date()
-    end = ((dt.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)).strftime("%Y-%m-%d")
-    return start, end
+    y, m = (int(p) for p in ym.split("-")[:2])
+    return f"{y:04d}-{m:02d}-01", f"{y:04d}-{m:02d}-{calendar.monthrange(y, m)[1]:02d}"
+
+
+def _spend_by_category(conn: sqlite3.Connection, start: str, end: str) -> Dict[str, float]:
+    """One range scan: category -> absolute spend (amount<0) within [start, end]."""
+    rows = conn.execute(
+        "SELECT category, COALESCE(SUM(amount),0) AS spent "
+        "FROM transactions WHERE amount<0 AND transaction_date BETWEEN ? AND ? "
+        "GROUP BY category",
+        (start, end),
+    ).fetchall()
+    return {r["category"]: abs(r["spent"] or 0.0) for r in rows}
 
 
 def recompute_tracking_for_month(ym: str):
@@ -1262,21 +1737,13 @@ def recompute_tracking_for_month(ym: str):
     try:
         start, end = _month_bounds(ym)
         budgets = conn.execute("SELECT id, category FROM budgets").fetchall()
-        for b in budgets:
-            spent = abs(
-                conn.execute(
-                    "SELECT COALESCE(SUM(amount),0) "
-                    "FROM transactions WHERE category=? AND amount<0 AND transaction_date BETWEEN ? AND ?",
-                    (b["category"], start, end),
-                ).fetchone()[0]
-                or 0.0
-            )
-            conn.execute(
-                "INSERT INTO budget_tracking(budget_id, month, spent, updated_at) "
-                "VALUES (?,?,?,CURRENT_TIMESTAMP) "
-                "ON CONFLICT(budget_id, month) DO UPDATE SET spent=excluded.spent, updated_at=CURRENT_TIMESTAMP",
-                (b["id"], ym, spent),
-            )
+        spent_by_cat = _spend_by_category(conn, start, end)
+        conn.executemany(
+            "INSERT INTO budget_tracking(budget_id, month, spent, updated_at) "
+            "VALUES (?,?,?,CURRENT_TIMESTAMP) "
+            "ON CONFLICT(budget_id, month) DO UPDATE SET spent=excluded.spent, updated_at=CURRENT_TIMESTAMP",
+            [(b["id"], ym, spent_by_cat.get(b["category"], 0.0)) for b in budgets],
+        )
         conn.commit()
     finally:
         conn.close()
@@ -1294,17 +1761,11 @@ def get_budget_status(start_date: str, end_date: str) -> List[Dict]:
         months = max(months, 1)
 
         budgets = conn.execute("SELECT category, limit_amount FROM budgets").fetchall()
+        spent_by_cat = _spend_by_category(conn, start_date, end_date)
         out = []
         for b in budgets:
             period_limit = float(b["limit_amount"]) * months
-            spent = abs(
-                conn.execute(
-                    "SELECT COALESCE(SUM(amount),0) FROM transactions "
-                    "WHERE category=? AND amount<0 AND transaction_date BETWEEN ? AND ?",
-                    (b["category"], start_date, end_date),
-                ).fetchone()[0]
-                or 0.0
-            )
+            spent = spent_by_cat.get(b["category"], 0.0)
             out.append(
                 {
                     "category": b["category"],
@@ -1343,10 +1804,14 @@ def uppercase_existing_transactions(conn=None):
         conn = get_db_connection()
         own = True
     try:
+        # Only rows that would actually change; re-runs write nothing
         conn.execute("""
           UPDATE transactions
              SET cleaned_description = UPPER(COALESCE(cleaned_description,'')),
                  merchant = CASE WHEN merchant IS NOT NULL THEN UPPER(merchant) ELSE merchant END
+           WHERE cleaned_description IS NULL
+              OR cleaned_description <> UPPER(cleaned_description)
+              OR merchant <> UPPER(merchant)
         """)
         conn.commit()
     finally:
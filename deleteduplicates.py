@@ -1,21 +1,28 @@
 #!/usr/bin/env python3
 import argparse, csv, datetime as dt, os, re, sqlite3, sys
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, TextIO
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+from pyarrow import csv as pacsv
 from pathlib import Path
 
+_WS_RE = re.compile(r"\s+")
+_NONALNUM_RE = re.compile(r"[^a-z0-9]")
+_KEYCHARS_RE = re.compile(r"[^a-z0-9|]")
+DATE_FMTS = ["%m/%d/%Y","%Y-%m-%d","%d/%m/%Y","%m/%d/%y","%d-%b-%Y","%b %d %Y","%b %d, %Y"]
+
 # Try to reuse your app's fingerprint if available, else fall back to a safe local one.
 try:
     from database import _fingerprint as app_fingerprint  # type: ignore
 except Exception:
     def app_fingerprint(account: str, date_ymd: str, description: str, amount: float) -> str:
         # Fallback fingerprint: deterministic, case/space/format insensitive.
-        desc = re.sub(r"\s+", " ", (description or "").strip().lower())
+        desc = _WS_RE.sub(" ", (description or "").strip().lower())
         date = (date_ymd or "").strip()
         cents = int(round(float(amount) * 100)) if amount not in (None, "") else 0
         key = f"{(account or '').strip().lower()}|{date}|{desc}|{cents}"
-        return re.sub(r"[^a-z0-9|]", "", key)
+        return _KEYCHARS_RE.sub("", key)
 
 DATE_CANDS = ["transaction_date","date","posted_date","post_date","dt","trans_date","statement_date"]
 AMOUNT_CANDS = ["amount","amt","value","transaction_amount","debit","credit","amount_usd"]
@@ -86,14 +93,13 @@ def resolve_dupes_path(in_csv: str, dupes_arg: Optional[str], to_downloads: bool
 
 def norm_text(x:str)->str:
     if x is None: return ""
-    return re.sub(r"\s+"," ",str(x).strip().lower())
+    return _WS_RE.sub(" ",str(x).strip().lower())
 def norm_ref(x:str)->str:
-    return re.sub(r"[^a-z0-9]","",norm_text(x)) if x is not None else ""
+    return _NONALNUM_RE.sub("",norm_text(x)) if x is not None else ""
 def parse_date_any(s: str) -> Optional[dt.datetime]:
     if s is None or str(s).strip()=="":
         return None
-    fmts = ["%m/%d/%Y","%Y-%m-%d","%d/%m/%Y","%m/%d/%y","%d-%b-%Y","%b %d %Y","%b %d, %Y"]
-    for f in fmts:
+    for f in DATE_FMTS:
         try: return dt.datetime.strptime(str(s).strip(), f)
         except: pass
     try:
@@ -111,6 +117,36 @@ def to_cents(x:Optional[float])->Optional[int]:
     if x is None: return None
     return int(round(x*100))
 
+# Column-wise versions of the helpers above, used by dedupe_df
+def norm_text_col(s: pd.Series) -> pd.Series:
+    return s.fillna("").astype(str).str.strip().str.lower().str.replace(_WS_RE, " ", regex=True)
+def norm_ref_col(s: pd.Series) -> pd.Series:
+    return norm_text_col(s).str.replace(_NONALNUM_RE, "", regex=True)
+def date_cols(s: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """(YYYY-MM-DD, MM/DD/YYYY) strings; same format priority as parse_date_any, "" when unparseable."""
+    txt = s.fillna("").astype(str).str.strip()
+    ymd_out = pd.Series("", index=s.index, dtype=object)
+    mdy_out = pd.Series("", index=s.index, dtype=object)
+    todo = txt.ne("")
+    for f in DATE_FMTS:
+        if not todo.any(): break
+        got = pd.to_datetime(txt[todo], format=f, errors="coerce")
+        got = got[got.notna()]
+        ymd_out[got.index] = got.dt.strftime("%Y-%m-%d")
+        mdy_out[got.index] = got.dt.strftime("%m/%d/%Y")
+        todo[got.index] = False
+    if todo.any():
+        # free-form leftovers: one mixed-format parse, each value inferred like pd.to_datetime(v)
+        rest = pd.to_datetime(txt[todo], format="mixed", errors="coerce")
+        rest = rest[[isinstance(d, dt.datetime) and pd.notna(d) for d in rest]]
+        ymd_out[rest.index] = [d.strftime("%Y-%m-%d") for d in rest]
+        mdy_out[rest.index] = [d.strftime("%m/%d/%Y") for d in rest]
+    return ymd_out, mdy_out
+def cents_col(s: pd.Series) -> pd.Series:
+    num = pd.to_numeric(s.fillna("").astype(str).str.replace(",", "", regex=False).str.strip(), errors="coerce")
+    num = num.where(np.isfinite(num))
+    return (num * 100).round().astype("Int64")
+
 def find_col(cols: List[str], cands: List[str]) -> Optional[str]:
     lower_map = {c.lower():c for c in cols}
     for c in cands:
@@ -129,95 +165,220 @@ def choose_winner(g: pd.DataFrame) -> pd.Series:
         return g.sort_values(cols, ascending=asc, kind="stable").iloc[0]
     return g.iloc[0]
 
-def dedupe_df(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str,str]]:
-    orig_cols = list(df.columns)
-    date_col     = find_col(orig_cols, [c.lower() for c in DATE_CANDS])
-    amount_col   = find_col(orig_cols, [c.lower() for c in AMOUNT_CANDS])
-    merchant_col = find_col(orig_cols, [c.lower() for c in MERCHANT_CANDS])
-    ref_col      = find_col(orig_cols, [c.lower() for c in REFERENCE_CANDS])
-    acct_col     = find_col(orig_cols, [c.lower() for c in ACCOUNT_CANDS])
-
-    info = {
-        "date_col": date_col or "",
-        "amount_col": amount_col or "",
-        "merchant_col": merchant_col or "",
-        "reference_col": ref_col or "",
-        "account_col": acct_col or "",
+def first_per_key(codes: np.ndarray, rank: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Bool array marking, among rows where mask is set, the best-ranked row of each key code."""
+    rows = np.flatnonzero(mask)
+    keep = np.zeros(len(codes), dtype=bool)
+    if not len(rows):
+        return keep
+    # most keys are unique: singleton groups keep their row without any reduction
+    multi = np.bincount(codes[rows])[codes[rows]] > 1
+    keep[rows[~multi]] = True
+    rows = rows[multi]
+    if not len(rows):
+        return keep
+    # one scatter-min pass over the rest (group -> lowest rank), no per-group sort
+    best = np.full(int(codes[rows].max()) + 1, len(codes), dtype=np.int64)
+    np.minimum.at(best, codes[rows], rank[rows])
+    keep[rows] = rank[rows] == best[codes[rows]]
+    return keep
+
+def has_repeats(codes: np.ndarray) -> bool:
+    codes = codes[codes >= 0]
+    return bool(len(codes)) and int(np.bincount(codes).max()) > 1
+
+def duplicate_mask(ref_codes: np.ndarray, mda_codes: np.ndarray, date_int: np.ndarray, mlen: np.ndarray) -> np.ndarray:
+    # Codes are -1 for an empty key. Clean inputs (the common case for fresh
+    # statements) have no repeated code and skip the sort entirely.
+    if not (has_repeats(ref_codes) or has_repeats(mda_codes)):
+        return np.zeros(len(ref_codes), dtype=bool)
+    # One winner order for both stages: earliest date, then longest merchant text
+    # (choose_winner's order, ties by row). Stage 1 dedupes on ref_key; stage 2 on
+    # mda_key among stage-1 survivors.
+    order = np.lexsort((-mlen, date_int))
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    has_ref = ref_codes >= 0
+    dup1 = has_ref & ~first_per_key(ref_codes, rank, has_ref)
+    has_mda = (mda_codes >= 0) & ~dup1
+    dup2 = has_mda & ~first_per_key(mda_codes, rank, has_mda)
+    return dup1 | dup2
+
+def detect_cols(orig_cols: List[str]) -> Dict[str,str]:
+    return {
+        "date_col": find_col(orig_cols, [c.lower() for c in DATE_CANDS]) or "",
+        "amount_col": find_col(orig_cols, [c.lower() for c in AMOUNT_CANDS]) or "",
+        "merchant_col": find_col(orig_cols, [c.lower() for c in MERCHANT_CANDS]) or "",
+        "reference_col": find_col(orig_cols, [c.lower() for c in REFERENCE_CANDS]) or "",
+        "account_col": find_col(orig_cols, [c.lower() for c in ACCOUNT_CANDS]) or "",
     }
 
+HELPER_COLS = {"_src_row","norm_merchant","merchant_len","norm_date_mmddyyyy","norm_date_ymd","norm_amount_cents",
+               "norm_reference","mda_key","ref_key","fp"}
+
+def add_norm_cols(df: pd.DataFrame, info: Dict[str,str]) -> pd.DataFrame:
+    date_col, amount_col, merchant_col = info["date_col"], info["amount_col"], info["merchant_col"]
+    ref_col, acct_col = info["reference_col"], info["account_col"]
     df = df.copy()
-    df["_src_row"] = np.arange(len(df))
-    df["norm_merchant"] = df[merchant_col].map(norm_text) if merchant_col else ""
+    df["norm_merchant"] = norm_text_col(df[merchant_col]) if merchant_col else ""
     df["merchant_len"]  = df["norm_merchant"].str.len() if merchant_col else 0
-    df["norm_date_ymd"] = df[date_col].map(ymd) if date_col else ""
-    df["norm_date_mmddyyyy"] = df[date_col].map(mmddyyyy) if date_col else ""
-    df["norm_amount_cents"] = df[amount_col].map(to_float).map(to_cents) if amount_col else None
-    df["norm_reference"] = df[ref_col].map(norm_ref) if ref_col else ""
-    # Fallback fingerprint for visibility/debug
-    df["fp"] = df.apply(
-        lambda r: app_fingerprint(
-            (str(r.get(acct_col,"")) if acct_col else ""),
-            r["norm_date_ymd"],
-            r["norm_merchant"],
-            (r["norm_amount_cents"]/100.0) if r["norm_amount_cents"] is not None else 0.0
-        ),
-        axis=1
-    )
-    df["mda_key"] = (
-        df["norm_merchant"].fillna("") + "|" +
-        df["norm_date_ymd"].fillna("") + "|" +
-        df["norm_amount_cents"].astype("Int64").astype(str).replace("<NA>","")
-    )
-    df["ref_key"] = df["norm_reference"]
-
-    # Stage 1: reference-based
-    has_ref = df["ref_key"].astype(bool)
-    df["_keep_ref"] = True
-    if has_ref.any():
-        winners_ref = df[has_ref].groupby("ref_key", dropna=False).apply(choose_winner).reset_index(drop=True)
-        keep_idx = set(winners_ref["_src_row"].tolist())
-        df["_keep_ref"] = df["_src_row"].isin(keep_idx)
-    df["_dup_stage1"] = has_ref & (~df["_keep_ref"])
-
-    # Stage 2: merchant+date+amount
-    remaining = df[~df["_dup_stage1"]].copy()
-    has_mda = remaining["mda_key"].astype(bool)
-    remaining["_keep_mda"] = True
-    if has_mda.any():
-        winners_mda = remaining[has_mda].groupby("mda_key", dropna=False).apply(choose_winner).reset_index(drop=True)
-        keep_idx_mda = set(winners_mda["_src_row"].tolist())
-        remaining["_keep_mda"] = remaining["_src_row"].isin(keep_idx_mda)
-    remaining["_dup_stage2"] = has_mda & (~remaining["_keep_mda"])
-
-    dup_idx = set(df.loc[df["_dup_stage1"], "_src_row"].tolist()) | set(remaining.loc[remaining["_dup_stage2"], "_src_row"].tolist())
-    df["_is_duplicate"] = df["_src_row"].isin(dup_idx)
-
-    clean = df[~df["_is_duplicate"]].copy()
-    dups  = df[df["_is_duplicate"]].copy()
-
-    # normalize transaction_date column (create if missing)
-    out_date_col = date_col or "transaction_date"
     if date_col:
-        clean[date_col] = clean["norm_date_mmddyyyy"]
+        df["norm_date_ymd"], df["norm_date_mmddyyyy"] = date_cols(df[date_col])
     else:
-        clean[out_date_col] = clean["norm_date_mmddyyyy"]
+        df["norm_date_ymd"] = ""
+        df["norm_date_mmddyyyy"] = ""
+    df["norm_amount_cents"] = cents_col(df[amount_col]) if amount_col else None
+    df["norm_reference"] = norm_ref_col(df[ref_col]) if ref_col else ""
+    # Fallback fingerprint for visibility/debug only (nothing downstream reads it):
+    # computed on request, zipped over the already-normalized columns
+    if os.environ.get("DEDUPE_DEBUG_FP"):
+        accts = df[acct_col].astype(str) if acct_col else [""] * len(df)
+        cents = df["norm_amount_cents"] if amount_col else [None] * len(df)
+        df["fp"] = [
+            app_fingerprint(a, d, m, (c / 100.0) if pd.notna(c) else 0.0)
+            for a, d, m, c in zip(accts, df["norm_date_ymd"], df["norm_merchant"], cents)
+        ]
+    df["ref_key"] = df["norm_reference"]
+    return df
 
-    # final cols: original order + ensured date col
-    helper = {"_src_row","norm_merchant","merchant_len","norm_date_mmddyyyy","norm_date_ymd","norm_amount_cents",
-              "norm_reference","mda_key","ref_key","_keep_ref","_dup_stage1","_keep_mda","_dup_stage2","_is_duplicate","fp"}
-    final_cols = [c for c in orig_cols if c in clean.columns and c not in helper]
+def order_cols(n: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """(date as YYYYMMDD int, -1 when blank; merchant length) for the winner order."""
+    date_int = pd.to_numeric(n["norm_date_ymd"].str.replace("-", "", regex=False), errors="coerce").fillna(-1)
+    return date_int.to_numpy(dtype=np.int64), n["merchant_len"].to_numpy(dtype=np.int64)
+
+def global_codes(local: np.ndarray, digests: np.ndarray, seen: Dict[int,int]) -> np.ndarray:
+    """Map chunk-local codes to file-wide ones through `seen`, keyed by each local key's 64-bit digest."""
+    # 8-byte digests instead of the key strings/tuples keep the table small; a clash
+    # inside one chunk is caught here, across chunks its odds are ~keys^2 / 2^65.
+    if len(np.unique(digests)) != len(digests):
+        raise ValueError("dedupe key digest collision; rerun without chunking (dedupe_df)")
+    lut = np.fromiter((seen.setdefault(h, len(seen)) for h in digests.tolist()), dtype=np.int64, count=len(digests))
+    return np.append(lut, -1)[local]
+
+def key_codes(keys: pd.Series, seen: Optional[Dict[int,int]] = None) -> np.ndarray:
+    """int64 codes for keys, -1 for empty ones; `seen` carries the code table across chunks."""
+    local, uniques = pd.factorize(keys.where(keys.astype(bool)), sort=False)
+    if seen is None:
+        return local.astype(np.int64)
+    return global_codes(local, pd.util.hash_array(np.asarray(uniques, dtype=object)), seen)
+
+def mda_codes(n: pd.DataFrame, seen: Optional[Dict[int,int]] = None) -> np.ndarray:
+    """int64 codes for the merchant+date+amount key; `seen` carries the code table across chunks."""
+    # factorize each part once and combine the codes arithmetically instead of
+    # hashing a joined "merchant|date|cents" string per row
+    parts = [n["norm_merchant"].fillna("").to_numpy(), n["norm_date_ymd"].fillna("").to_numpy(),
+             n["norm_amount_cents"].astype("Int64").to_numpy(dtype=np.int64, na_value=np.iinfo(np.int64).min)]
+    codes = np.zeros(len(n), dtype=np.int64)
+    for p in parts:
+        k, u = pd.factorize(p)
+        codes = codes * max(len(u), 1) + k
+    codes, _ = pd.factorize(codes, sort=False)
+    if seen is None:
+        return codes.astype(np.int64)
+    first = np.unique(codes, return_index=True)[1]
+    firsts = pd.DataFrame({i: p[first] for i, p in enumerate(parts)})
+    return global_codes(codes, pd.util.hash_pandas_object(firsts, index=False).to_numpy(), seen)
+
+def clean_frame(df: pd.DataFrame, info: Dict[str,str], mmddyyyy_col) -> pd.DataFrame:
+    # normalize transaction_date column (create if missing); original order + ensured date col
+    out_date_col = info["date_col"] or "transaction_date"
+    clean = df.copy()
+    clean[out_date_col] = mmddyyyy_col
+    final_cols = [c for c in df.columns if c not in HELPER_COLS]
     if out_date_col not in final_cols: final_cols.append(out_date_col)
-    return clean[final_cols], dups[orig_cols], info
+    return clean[final_cols]
+
+def dedupe_df(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str,str]]:
+    orig_cols = list(df.columns)
+    info = detect_cols(orig_cols)
+    n = add_norm_cols(df, info)
+    is_dup = duplicate_mask(key_codes(n["ref_key"]), mda_codes(n), *order_cols(n))
+    clean = clean_frame(df[~is_dup], info, n.loc[~is_dup, "norm_date_mmddyyyy"].to_numpy())
+    return clean, df.loc[is_dup, orig_cols], info
+
+CHUNK_ROWS = 200_000
+CHUNK_BYTES = 16 << 20
+
+def csv_header(in_csv: str) -> List[str]:
+    with open(in_csv, newline="", encoding="utf-8-sig") as f:
+        return next(csv.reader(f), [])
+
+def iter_csv_chunks(in_csv: str, arrow: bool = True):
+    """Yield the CSV as string-typed chunks, blanks kept as "" (pd.read_csv(dtype=str, na_filter=False) semantics)."""
+    header = csv_header(in_csv)
+    if arrow and header and all(h.strip() for h in header) and len(set(header)) == len(header):
+        reader = pacsv.open_csv(
+            in_csv,
+            read_options=pacsv.ReadOptions(column_names=header, skip_rows=1, block_size=CHUNK_BYTES),
+            parse_options=pacsv.ParseOptions(newlines_in_values=True),
+            convert_options=pacsv.ConvertOptions(column_types={c: pa.string() for c in header}, strings_can_be_null=False),
+        )
+        chunks = (pa.Table.from_batches([b]).to_pandas(types_mapper=pd.ArrowDtype) for b in reader)
+        empty = pd.DataFrame({c: pd.Series(dtype=object) for c in header})
+    else:
+        # empty/duplicate headers: pandas renames or reports them as before
+        chunks = pd.read_csv(in_csv, dtype=str, keep_default_na=False, na_filter=False, chunksize=CHUNK_ROWS)
+        empty = None
+    yielded = False
+    for chunk in chunks:
+        yielded = True
+        yield chunk.reset_index(drop=True)
+    if not yielded and empty is not None:
+        yield empty
+
+def scan_csv(in_csv: str, arrow: bool):
+    """Pass 1: per-row key codes and winner-order columns only; the rows themselves are not kept."""
+    info, ref_seen, mda_seen = None, {}, {}
+    parts = ([], [], [], [])
+    for chunk in iter_csv_chunks(in_csv, arrow):
+        if info is None:
+            info = detect_cols(list(chunk.columns))
+        n = add_norm_cols(chunk, info)
+        date_int, mlen = order_cols(n)
+        for p, a in zip(parts, (key_codes(n["ref_key"], ref_seen), mda_codes(n, mda_seen), date_int, mlen)):
+            p.append(a)
+    return info, [np.concatenate(p) if p else np.zeros(0, dtype=np.int64) for p in parts]
+
+def write_csv_chunk(writers: Dict[Path, TextIO], path: Path, frame: pd.DataFrame):
+    """
+    Append frame to path (header on first write) with DataFrame.to_csv, so the
+    quoting and line endings stay byte-identical to the one-shot to_csv output.
+    """
+    first = path not in writers
+    if first:
+        writers[path] = open(path, "w", newline="", encoding="utf-8")
+    frame.to_csv(writers[path], index=False, header=first)
 
 def dedupe_csv(in_csv: str, out_csv: Path, dupes_csv: Optional[Path] = None):
-    df = pd.read_csv(in_csv, dtype=str, keep_default_na=False, na_filter=False)
-    clean, dups, info = dedupe_df(df)
+    # Two streaming passes keep peak memory at one chunk plus a few ints per row:
+    # pass 1 collects key codes, then the duplicate mask is computed over the whole
+    # file, pass 2 re-reads and writes each chunk's clean/duplicate rows.
+    arrow = True
+    try:
+        info, cols = scan_csv(in_csv, arrow)
+    except pa.ArrowInvalid:
+        # ragged rows etc.: let pandas handle (or report) them as before
+        arrow = False
+        info, cols = scan_csv(in_csv, arrow)
+    is_dup = duplicate_mask(*cols)
+
     out_csv.parent.mkdir(parents=True, exist_ok=True)
-    clean.to_csv(out_csv, index=False)
     if dupes_csv:
         dupes_csv.parent.mkdir(parents=True, exist_ok=True)
-        dups.to_csv(dupes_csv, index=False)
-    print(f"[CSV] rows_in={len(df)} rows_out={len(clean)} removed={len(df)-len(clean)}")
+    start, writers = 0, {}
+    try:
+        for chunk in iter_csv_chunks(in_csv, arrow):
+            dup = is_dup[start:start + len(chunk)]
+            start += len(chunk)
+            mdy = date_cols(chunk.loc[~dup, info["date_col"]])[1].to_numpy() if info["date_col"] else ""
+            write_csv_chunk(writers, out_csv, clean_frame(chunk[~dup], info, mdy))
+            if dupes_csv:
+                write_csv_chunk(writers, dupes_csv, chunk[dup])
+    finally:
+        for f in writers.values():
+            f.close()
+    rows_in, rows_out = len(is_dup), int((~is_dup).sum())
+    print(f"[CSV] rows_in={rows_in} rows_out={rows_out} removed={rows_in-rows_out}")
     print(f"[CSV] wrote clean -> {out_csv}")
     if dupes_csv:
         print(f"[CSV] wrote duplicates -> {dupes_csv}")
@@ -227,6 +388,10 @@ def get_conn(path: str) -> sqlite3.Connection:
     conn = sqlite3.connect(path)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys=ON")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-262144")
     return conn
 
 def export_ids_to_csv(conn: sqlite3.Connection, ids: List[int], path: str):
@@ -247,31 +412,29 @@ def ensure_backup_table(conn: sqlite3.Connection):
         SELECT * FROM transactions WHERE 0
     """)
 
+def stage_ids(conn: sqlite3.Connection, ids: List[int]):
+    # One temp table of ids -> one INSERT/DELETE plan, whatever the id count
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS _dedupe_ids(id INTEGER PRIMARY KEY)")
+    conn.execute("DELETE FROM _dedupe_ids")
+    conn.executemany("INSERT OR IGNORE INTO _dedupe_ids(id) VALUES (?)", ((i,) for i in ids))
+
 def copy_rows_to_backup_table(conn: sqlite3.Connection, ids: List[int]) -> int:
     if not ids: return 0
     ensure_backup_table(conn)
-    total=0
-    for i in range(0,len(ids),900):
-        chunk=ids[i:i+900]
-        conn.execute(f"INSERT INTO deleted_transactions SELECT * FROM transactions WHERE id IN ({','.join('?' for _ in chunk)})", chunk)
-        total += len(chunk)
-    return total
+    stage_ids(conn, ids)
+    return conn.execute("INSERT INTO deleted_transactions SELECT * FROM transactions WHERE id IN (SELECT id FROM _dedupe_ids)").rowcount
 
 def delete_rows(conn: sqlite3.Connection, ids: List[int]) -> int:
     if not ids: return 0
-    total=0
-    for i in range(0,len(ids),900):
-        chunk=ids[i:i+900]
-        conn.execute(f"DELETE FROM transactions WHERE id IN ({','.join('?' for _ in chunk)})", chunk)
-        total += len(chunk)
-    return total
+    stage_ids(conn, ids)
+    return conn.execute("DELETE FROM transactions WHERE id IN (SELECT id FROM _dedupe_ids)").rowcount
 
 def from_db_to_df(conn: sqlite3.Connection) -> pd.DataFrame:
-    # Pull everything (stringify), for robust pandas processing
-    df = pd.read_sql_query("SELECT * FROM transactions", conn)
-    for c in df.columns:
-        df[c] = df[c].astype(str).fillna("")
-    return df
+    # Pull everything (stringify, NULL -> ""), for robust pandas processing
+    cur = conn.execute("SELECT * FROM transactions")
+    cols = [d[0] for d in cur.description]
+    df = pd.DataFrame(cur.fetchall(), columns=cols, dtype=object)
+    return df.astype(str).mask(df.isna(), "")
 
 def main():
     ap = argparse.ArgumentParser(description="Nuclear duplicate killer for CSV or SQLite DB.")
@@ -300,11 +463,10 @@ def main():
         df = from_db_to_df(conn)
         clean, dups, info = dedupe_df(df)
 
-        # Map cleaned rows back to IDs to delete
-        keep_mask = ~df.index.isin(dups.index)
-        losers_ids = df.loc[~keep_mask, "id"].astype(int).tolist()
+        # Duplicate rows carry their own ids
+        losers_ids = dups["id"].astype(int).tolist()
 
-        print(f"[DB] scanned={len(df)} keep={keep_mask.sum()} delete={len(losers_ids)}")
+        print(f"[DB] scanned={len(df)} keep={len(clean)} delete={len(losers_ids)}")
         print(f"[DB] columns used → date={info['date_col']} amount={info['amount_col']} merchant={info['merchant_col']} ref={info['reference_col']} account={info['account_col']}")
 
         if args.show and len(losers_ids):
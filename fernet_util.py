@@ -1,6 +1,8 @@
 import os, base64, hashlib
+from functools import lru_cache
 from cryptography.fernet import Fernet
 
+@lru_cache(maxsize=1)
 def _get_fernet_key_str() -> str:
     k = os.getenv("FERNET_KEY", "")
     if k:
@@ -20,5 +22,8 @@ FERNET = Fernet(_k.encode("utf-8"))
 
 def encrypt(s: str) -> str:
     return FERNET.encrypt(s.encode("utf-8")).decode("utf-8")
+# decrypt is deterministic for a given token (encrypt is not: fresh IV per call),
+# so repeated reads of the same stored token skip the HMAC check + AES.
+@lru_cache(maxsize=4096)
 def decrypt(s: str) -> str:
     return FERNET.decrypt(s.encode("utf-8")).decode("utf-8")
@@ -1,23 +1,32 @@
 # grail_loader.py (v6 — robust CSV mapping; DB-aware inserts)
 import argparse
+import csv
 import hashlib
 import re
 import sqlite3
+from datetime import datetime
+from functools import lru_cache
+from itertools import compress
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pacsv
 
-from database import get_db_connection, get_or_create_account
+from database import get_db_connection
 
 CSV_DEFAULT = "The New Wholy Grail - CLEAN.csv"
 
 # ----------------------------
 # CSV header normalization
 # ----------------------------
+_CANON_RE = re.compile(r"[^a-z0-9]+")
+
 def _canon(s: str) -> str:
     """Normalize a header: lowercase, collapse non-alphanum to underscores."""
-    return re.sub(r"[^a-z0-9]+", "_", (s or "").strip().lower()).strip("_")
+    return _CANON_RE.sub("_", (s or "").strip().lower()).strip("_")
 
 # Canonical field -> list of acceptable header aliases (normalized via _canon)
 CSV_ALIASES: Dict[str, list] = {
@@ -56,6 +65,10 @@ CSV_ALIASES: Dict[str, list] = {
 
 def map_headers(df_columns) -> Dict[str, Optional[str]]:
     """Return mapping canonical_field -> actual CSV column (or None if not present)."""
+    return dict(_map_headers_cached(tuple(df_columns)))
+
+@lru_cache(maxsize=32)
+def _map_headers_cached(df_columns: Tuple[str, ...]) -> Dict[str, Optional[str]]:
     norm_map = {_canon(col): col for col in df_columns}
     out: Dict[str, Optional[str]] = {}
     for want, aliases in CSV_ALIASES.items():
@@ -68,6 +81,79 @@ def map_headers(df_columns) -> Dict[str, Optional[str]]:
         out[want] = found
     return out
 
+CHUNK_ROWS = 200_000          # pandas fallback chunk size
+CHUNK_BYTES = 16 << 20        # pyarrow block size (~rows per chunk depends on row width)
+ARROW_STR = "string[pyarrow]"
+
+def _csv_header(csv_file: Path) -> List[str]:
+    with open(csv_file, newline="", encoding="utf-8-sig") as f:
+        return next(csv.reader(f), [])
+
+def _iter_csv_columns(csv_file: Path, usecols: List[str], arrow: bool = True):
+    """
+    Yield only `usecols` of the CSV in bounded chunks, all as raw strings
+    (pd.read_csv(dtype=str, na_filter=False) semantics). pyarrow's streaming reader
+    unless arrow=False or the header has duplicate names, which pandas de-duplicates.
+    """
+    header = _csv_header(csv_file)
+    if arrow and header and len(set(header)) == len(header):
+        reader = pacsv.open_csv(
+            csv_file,
+            read_options=pacsv.ReadOptions(column_names=header, skip_rows=1, block_size=CHUNK_BYTES),
+            parse_options=pacsv.ParseOptions(newlines_in_values=True),
+            convert_options=pacsv.ConvertOptions(
+                include_columns=usecols,
+                column_types={c: pa.string() for c in usecols},
+                strings_can_be_null=False,
+            ),
+        )
+        as_arrow_str = {pa.string(): pd.StringDtype("pyarrow")}.get
+        for batch in reader:
+            yield batch.to_pandas(types_mapper=as_arrow_str)
+    else:
+        yield from pd.read_csv(
+            csv_file, dtype=str, keep_default_na=False, na_filter=False, usecols=usecols, chunksize=CHUNK_ROWS
+        )
+
+def _blank_col(df: pd.DataFrame) -> pd.Series:
+    return pd.Series("", index=df.index, dtype=ARROW_STR)
+
+def _prepare_chunk(df: pd.DataFrame, src: Dict[str, Optional[str]]) -> None:
+    """
+    Add the normalized *_final / date_std / amount_float columns the insert reads.
+    Text columns are Arrow-backed strings so the later .str passes run on Arrow kernels.
+    """
+    df["date_std"] = _std_dates_to_ymd(df[src["date"]])
+    amt = df[src["amount"]].astype(ARROW_STR)
+    # plain "-12.34" style values go straight to the numeric parser; only the rest are cleaned
+    plain = amt.str.fullmatch(r"-?\d+(\.\d+)?").fillna(False).astype(bool)
+    if not plain.all():
+        amt = amt.where(plain, amt.str.replace(",", "", regex=False).str.strip())
+    df["amount_float"] = pd.to_numeric(amt, errors="coerce").fillna(0.0).astype(float)
+
+    # Descriptions
+    orig_col, clean_col, merch_col = src["original_description"], src["clean"], src["merchant"]
+    if orig_col:
+        df["orig_desc_final"] = df[orig_col].astype(ARROW_STR)
+    else:
+        df["orig_desc_final"] = df[merch_col].astype(ARROW_STR) if merch_col else _blank_col(df)
+
+    if clean_col:
+        df["clean_desc_final"] = df[clean_col].astype(ARROW_STR)
+    else:
+        # fallback cascade
+        if src["cleaned_description"]:
+            df["clean_desc_final"] = df[src["cleaned_description"]].astype(ARROW_STR)
+        elif merch_col:
+            df["clean_desc_final"] = df[merch_col].astype(ARROW_STR)
+        else:
+            df["clean_desc_final"] = _blank_col(df)
+
+    # Category/subcategory (exact from CLEAN)
+    cat_col, subcat_col = src["category"], src["subcategory"]
+    df["category_final"] = df[cat_col].astype(ARROW_STR) if cat_col in df.columns else _blank_col(df)
+    df["subcategory_final"] = df[subcat_col].astype(ARROW_STR) if subcat_col in df.columns else _blank_col(df)
+
 # ----------------------------
 # DB schema detection
 # ----------------------------
@@ -89,31 +175,112 @@ def _detect_txn_columns(conn: sqlite3.Connection) -> Dict[str, bool]:
 # ----------------------------
 # Normalizers
 # ----------------------------
-def _std_date_to_ymd(s: str) -> str:
+def _std_dates_to_ymd(ser: pd.Series) -> pd.Series:
     """
-    Accepts mm/dd/yyyy or yyyy-mm-dd (and common variants); returns yyyy-mm-dd.
+    Accepts mm/dd/yyyy or yyyy-mm-dd (and common variants); returns yyyy-mm-dd ("" if unparseable).
     """
-    s = (s or "").strip()
-    if not s:
-        return ""
-    # try strict mm/dd/yyyy first (your CLEAN file uses this)
-    m = pd.to_datetime(s, errors="coerce", format="%m/%d/%Y")
-    if pd.isna(m):
-        m = pd.to_datetime(s, errors="coerce")
-    return "" if pd.isna(m) else m.strftime("%Y-%m-%d")
-
-def _to_float_amount(x) -> float:
-    s = str(x).replace(",", "").strip()
-    if s == "":
-        return 0.0
-    try:
-        return float(s)
-    except Exception:
-        return 0.0
+    s = ser.fillna("").astype(str).str.strip()
+    out = pd.Series("", index=s.index, dtype=object)
+    # already yyyy-mm-dd: validate with the exact format and keep the text, no strftime
+    iso = s.str.fullmatch(r"\d{4}-\d{2}-\d{2}")
+    if iso.any():
+        ok = iso.copy()
+        ok[iso] = pd.to_datetime(s[iso], errors="coerce", format="%Y-%m-%d").notna()
+        out[ok] = s[ok]
+    todo = s.ne("") & out.eq("")
+    if todo.any():
+        # strict mm/dd/yyyy next (your CLEAN file uses this), one vectorized pass
+        d = pd.to_datetime(s[todo], errors="coerce", format="%m/%d/%Y")
+        out[d.index] = d.dt.strftime("%Y-%m-%d").fillna("")
+        rest = d.index[d.isna()]
+        if len(rest):
+            # everything else: per-value inference, as pd.to_datetime(value) would
+            m = pd.to_datetime(s[rest], errors="coerce", format="mixed")
+            # mixed offsets give an object Series in which NaT can come back as the string "NaT"
+            m = m[[isinstance(x, datetime) and pd.notna(x) for x in m]]
+            out[m.index] = [x.strftime("%Y-%m-%d") for x in m]
+    return out
+
+def _fingerprints(account_ids: List, dates_ymd: List[str], clean_descs: List[str],
+                  amounts: List[float], txn_ids: List[str], legacy: bool = False) -> List[str]:
+    """
+    Column-wise row fingerprints: the "acct|date|desc|amount|txid" basis is built with
+    pandas string ops, leaving only the hash call in the per-row loop.
+    Digest is blake2b-128 (32 hex chars); legacy=True gives the old sha256 (64 hex chars)
+    so --no-wipe loads still match rows stored by earlier versions.
+    """
+    desc = pd.Series(clean_descs, dtype=object).fillna("").astype(str).str.strip().str.lower()
+    amt = pd.Series(np.char.mod("%.2f", np.asarray(amounts, dtype=float)), dtype=object)
+    txid = pd.Series(txn_ids, dtype=object).fillna("").astype(str).str.strip()
+    basis = (
+        pd.Series(account_ids, dtype=object).astype(str) + "|" + pd.Series(dates_ymd, dtype=object)
+        + "|" + desc + "|" + amt + "|" + txid
+    )
+    if legacy:
+        sha256 = hashlib.sha256
+        return [sha256(b.encode("utf-8")).hexdigest() for b in basis.to_numpy()]
+    blake2b = hashlib.blake2b
+    return [blake2b(b.encode("utf-8"), digest_size=16).hexdigest() for b in basis.to_numpy()]
+
+def _has_legacy_fingerprints(conn: sqlite3.Connection, fp_col: str) -> bool:
+    """True if any stored fingerprint is an old 64-char sha256 hex digest."""
+    row = conn.execute(f"SELECT 1 FROM transactions WHERE length({fp_col}) = 64 LIMIT 1").fetchone()
+    return row is not None
+
+def _bulk_load_indexes(conn: sqlite3.Connection, fp_col: Optional[str]) -> List[Tuple[str, str, bool]]:
+    """
+    (name, CREATE sql, unique) of the explicit transactions indexes worth dropping while bulk
+    loading an emptied table: every non-unique one, plus UNIQUE ones on the fingerprint
+    alone. Other UNIQUE indexes and column constraints stay in place.
+    """
+    out: List[Tuple[str, str, bool]] = []
+    for _seq, name, unique, origin, *_ in conn.execute("PRAGMA index_list('transactions')").fetchall():
+        if origin != "c":
+            continue
+        if unique:
+            cols = [r[2] for r in conn.execute(f"PRAGMA index_info('{name}')")]
+            if not fp_col or cols != [fp_col]:
+                continue
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE type='index' AND name=?", (name,)).fetchone()
+        if row and row[0]:
+            out.append((name, row[0], bool(unique)))
+    return out
 
-def _fingerprint(account_id: int, date_ymd: str, clean_desc: str, amount: float, txn_id: Optional[str]) -> str:
-    basis = f"{account_id}|{date_ymd}|{(clean_desc or '').strip().lower()}|{amount:.2f}|{(txn_id or '').strip()}"
-    return hashlib.sha256(basis.encode("utf-8")).hexdigest()
+def _unique_key_columns(conn: sqlite3.Connection) -> List[List[str]]:
+    """Column lists of the full (non-partial) UNIQUE indexes/constraints on transactions."""
+    out: List[List[str]] = []
+    for _seq, name, unique, _origin, partial in conn.execute("PRAGMA index_list('transactions')").fetchall():
+        if unique and not partial:
+            out.append([r[2] for r in conn.execute(f"PRAGMA index_info('{name}')")])
+    return out
+
+def _or_ignore_mask(keys: List[List], seen: Optional[List[set]] = None) -> List[bool]:
+    """
+    Replay INSERT OR IGNORE in Python: a row is kept unless one of its unique keys was
+    already taken by an earlier kept row. `keys` holds one value list per unique key;
+    None (SQL NULL) never conflicts. Pass the same `seen` sets to carry keys across chunks.
+    """
+    if seen is None:
+        seen = [set() for _ in keys]
+    keep: List[bool] = []
+    for row_keys in zip(*keys):
+        if any(k is not None and k in taken for k, taken in zip(row_keys, seen)):
+            keep.append(False)
+            continue
+        for k, taken in zip(row_keys, seen):
+            if k is not None:
+                taken.add(k)
+        keep.append(True)
+    return keep
+
+def _scan_accounts(csv_file: Path, acct_col: str, arrow: bool) -> Tuple[set, int]:
+    """Pass 1 over the CSV: distinct account names and the row count."""
+    names: set = set()
+    n_rows = 0
+    for chunk in _iter_csv_columns(csv_file, [acct_col], arrow):
+        names.update(chunk[acct_col].unique())
+        n_rows += len(chunk)
+    return names, n_rows
 
 # ----------------------------
 # Loader
@@ -123,7 +290,7 @@ def run_grail_load(csv_path: str, wipe: bool = True):
     Load 'The New Wholy Grail - CLEAN.csv' into the DB, using Accountant 6's schema:
       - categories come EXACTLY from 'new_category'
       - subcategory from 'Sub_category'/'subcategory' if present
-      - accounts created via get_or_create_account
+      - accounts created on first sight (INSERT ... RETURNING id)
       - optional wipe (transactions + category_rules) before load
       - DB-aware insert: only uses columns that actually exist in 'transactions'
     """
@@ -136,13 +303,10 @@ def run_grail_load(csv_path: str, wipe: bool = True):
     try:
         cur = conn.cursor()
 
-        # Read CSV
+        # Header-only pre-scan; the rows are then streamed in chunks, mapped columns only
         print("Reading CSV...")
-        df = pd.read_csv(csv_file, dtype=str, keep_default_na=False, na_filter=False)
-        print(f"Rows in file: {len(df)}")
-
-        # Header mapping (tolerant)
-        hdr = map_headers(df.columns)
+        headers = list(pd.read_csv(csv_file, nrows=0).columns)
+        hdr = map_headers(headers)
         print("CSV column mapping (detected):", {k: v for k, v in hdr.items() if v})
 
         # Required minimal inputs
@@ -151,55 +315,54 @@ def run_grail_load(csv_path: str, wipe: bool = True):
         if missing:
             raise ValueError(
                 f"Missing required CSV columns (any alias): {missing}. "
-                f"Available headers: {list(df.columns)}"
+                f"Available headers: {headers}"
             )
 
         # Resolve source columns (None if not present)
         def col(key: str) -> Optional[str]:
             return hdr.get(key) or None
 
-        date_col   = col("date")
-        acct_col   = col("account")
-        amt_col    = col("amount")
-        merch_col  = col("merchant")
-        txid_col   = col("transaction_id")
-        orig_col   = col("original_description")
-        clean_col  = col("new_description") or col("cleaned_description") or merch_col
-        cat_col    = col("new_category") or "category"   # prefer new_category; tolerate legacy 'category'
-        subcat_col = col("subcategory")  # may be None
-
-        # Normalize essentials
-        print("Normalizing dates and amounts...")
-        df["date_std"] = df[date_col].apply(_std_date_to_ymd)
-        df["amount_float"] = df[amt_col].apply(_to_float_amount)
-
-        # Descriptions
-        if orig_col:
-            df["orig_desc_final"] = df[orig_col].astype(str)
-        else:
-            df["orig_desc_final"] = df[merch_col].astype(str) if merch_col else ""
-
-        if clean_col:
-            df["clean_desc_final"] = df[clean_col].astype(str)
-        else:
-            # fallback cascade
-            if col("cleaned_description"):
-                df["clean_desc_final"] = df[col("cleaned_description")].astype(str)
-            elif merch_col:
-                df["clean_desc_final"] = df[merch_col].astype(str)
-            else:
-                df["clean_desc_final"] = ""
-
-        # Category/subcategory (exact from CLEAN)
-        df["category_final"] = df[cat_col].astype(str) if cat_col in df.columns else ""
-        df["subcategory_final"] = df[subcat_col].astype(str) if subcat_col in df.columns else ""
+        acct_col  = col("account")
+        merch_col = col("merchant")
+        txid_col  = col("transaction_id")
+        src = {
+            "date":                 col("date"),
+            "amount":               col("amount"),
+            "merchant":             merch_col,
+            "original_description": col("original_description"),
+            "cleaned_description":  col("cleaned_description"),
+            "clean":                col("new_description") or col("cleaned_description") or merch_col,
+            "category":             col("new_category") or "category",  # prefer new_category; tolerate legacy 'category'
+            "subcategory":          col("subcategory"),  # may be None
+        }
+        # plus the literal names the legacy category and rules-rebuild paths look up
+        wanted = {v for v in hdr.values() if v} | {"category", "new_description", "cleaned_description"}
+        usecols = [c for c in headers if c in wanted]
+
+        # Pass 1: account names and row count only (also proves pyarrow can parse the file)
+        arrow = True
+        try:
+            acc_names, n_rows = _scan_accounts(csv_file, acct_col, arrow)
+        except pa.ArrowInvalid:
+            arrow = False
+            acc_names, n_rows = _scan_accounts(csv_file, acct_col, arrow)
+        print(f"Rows in file: {n_rows}")
 
         # Accounts sync
         print("Syncing accounts...")
         accounts_map: Dict[str, int] = {}
-        for acc_name in sorted(df[acct_col].unique()):
-            acc_id = get_or_create_account(conn, acc_name)
-            accounts_map[acc_name] = acc_id
+        existing = {r["name"]: r["id"] for r in conn.execute("SELECT id, name FROM accounts")}
+        for acc_name in sorted(acc_names):
+            acc_id = existing.get(acc_name)
+            if acc_id is None:
+                # one statement per new account; the no-op DO UPDATE makes RETURNING
+                # yield the id even if another writer created it meanwhile
+                acc_id = cur.execute(
+                    "INSERT INTO accounts(name) VALUES(?) "
+                    "ON CONFLICT(name) DO UPDATE SET name = excluded.name RETURNING id",
+                    (acc_name,),
+                ).fetchone()[0]
+            accounts_map[acc_name] = int(acc_id)
         conn.commit()
         print(f"Synchronized {len(accounts_map)} accounts.")
 
@@ -260,81 +423,103 @@ def run_grail_load(csv_path: str, wipe: bool = True):
 
         insert_cols = base_cols + extra_cols
         placeholders = ", ".join("?" for _ in insert_cols)
-        sql = f"INSERT INTO transactions ({', '.join(insert_cols)}) VALUES ({placeholders})"
+        sql = f"INSERT OR IGNORE INTO transactions ({', '.join(insert_cols)}) VALUES ({placeholders})"
+        legacy_fp = bool(fp_db_col) and not wipe and _has_legacy_fingerprints(conn, fp_db_col)
+
+        # On a wiped table, drop the secondary and fingerprint indexes for the load and
+        # rebuild them once at the end instead of maintaining them on every insert
+        deferred = _bulk_load_indexes(conn, fp_db_col) if wipe else []
+        unique_keys: List[List[str]] = []
+        if fp_db_col and wipe:
+            # drop in-file repeats in Python, exactly as OR IGNORE would against the emptied
+            # table, so SQLite only sees rows that go in (and a deferred UNIQUE index rebuilds)
+            unique_keys = [cols for cols in _unique_key_columns(conn) if set(cols) <= set(insert_cols)]
+            if [fp_db_col] not in unique_keys:
+                unique_keys.append([fp_db_col])
+        seen_keys: List[set] = [set() for _ in unique_keys]
+
+        # Rules source column (prefer new_description for pattern; else cleaned_description)
+        pattern_col = next((c for c in ("new_description", "cleaned_description") if c in headers), None)
+        rule_pairs: Dict[Tuple[str, str], None] = {}
+
+        # Frame column feeding each insert column, resolved once for all chunks;
+        # the fingerprint is derived from the others per chunk
+        frame_cols: Dict[str, Optional[str]] = {
+            "transaction_date": "date_std",
+            "amount": "amount_float",
+            "account_id": "account_id",
+            "category": "category_final",
+            "original_description": "orig_desc_final",
+            "cleaned_description": "clean_desc_final",
+            "merchant": merch_col or "",
+            "transaction_id": txid_col or "",
+        }
+        if subcat_db_col:
+            frame_cols[subcat_db_col] = "subcategory_final"
+        sources = [(name, frame_cols.get(name)) for name in insert_cols if name != fp_db_col]
 
-        # Insert rows
+        # Pass 2: normalize and insert chunk by chunk, all in one write transaction;
+        # OR IGNORE skips rows that collide on a UNIQUE key instead of failing the batch
+        print("Normalizing dates and amounts...")
         print("Inserting transactions...")
         inserted = 0
-        skipped = 0
-
-        for _, row in df.iterrows():
-            account_id = accounts_map[row[acct_col]]
-            t_date = row["date_std"]
-            t_amount = float(row["amount_float"])
-            t_category = row["category_final"]
-
-            values = [t_date, t_amount, account_id, t_category]
-
-            for name in extra_cols:
-                if name == subcat_db_col:
-                    values.append(row["subcategory_final"])
-                elif name == "original_description":
-                    values.append(row["orig_desc_final"])
-                elif name == "cleaned_description":
-                    values.append(row["clean_desc_final"])
-                elif name == "merchant":
-                    values.append(row[merch_col] if merch_col else "")
-                elif name == "transaction_id":
-                    values.append(row[txid_col] if txid_col else "")
-                elif name in ("unique_fingerprint", "unique_hash"):
-                    fp = _fingerprint(
-                        account_id=account_id,
-                        date_ymd=t_date,
-                        clean_desc=row["clean_desc_final"],
-                        amount=t_amount,
-                        txn_id=row[txid_col] if txid_col else "",
-                    )
-                    values.append(fp)
-                elif name in ("ai_category", "ai_subcategory"):
-                    values.append(None)
-                else:
-                    values.append(None)
+        cur.execute("BEGIN IMMEDIATE")
+        for name, _, _ in deferred:
+            cur.execute(f'DROP INDEX IF EXISTS "{name}"')
+        for df in _iter_csv_columns(csv_file, usecols, arrow):
+            _prepare_chunk(df, src)
+            df["account_id"] = df[acct_col].map(accounts_map).astype("int64")
+            n = len(df)
+
+            # "" fills a missing text source with blanks, None with NULLs
+            values_by_col = {name: df[c].tolist() if c else [c] * n for name, c in sources}
+            if fp_db_col:
+                values_by_col[fp_db_col] = _fingerprints(
+                    values_by_col["account_id"], values_by_col["transaction_date"],
+                    df["clean_desc_final"].tolist(), values_by_col["amount"],
+                    df[txid_col].tolist() if txid_col else [""] * n, legacy=legacy_fp,
+                )
 
-            try:
-                cur.execute(sql, values)
-                inserted += 1
-            except Exception as e:
-                # Unique constraint collision or other row-specific failure
-                skipped += 1
-                # Uncomment for debugging:
-                # print(f"Skip row due to error: {e}")
+            rows = zip(*(values_by_col[name] for name in insert_cols))
+            if unique_keys:
+                key_values = [
+                    [
+                        None if None in key else key
+                        for key in zip(*(values_by_col.get(c, [None] * n) for c in cols))
+                    ]
+                    for cols in unique_keys
+                ]
+                rows = compress(rows, _or_ignore_mask(key_values, seen_keys))
+            cur.executemany(sql, rows)
+            inserted += max(cur.rowcount, 0)
+
+            if pattern_col:
+                # both are already str columns (raw CSV text / category_final), no astype copies
+                pattern = df[pattern_col].str.strip().str.lower()
+                cat = df["category_final"].str.strip()
+                keep = (pattern != "") & (cat != "")
+                # distinct (pattern, cat) pairs in first-seen order, across chunks
+                rule_pairs.update(dict.fromkeys(zip(pattern[keep].to_numpy(), cat[keep].to_numpy())))
+        for _, create_sql, _ in deferred:
+            cur.execute(create_sql)
+        skipped = n_rows - inserted
 
         conn.commit()
         print(f"✅ Inserted: {inserted}   Skipped: {skipped}")
 
         # Rebuild category rules strictly from CLEAN file
         try:
-            if "new_description" in df.columns or "cleaned_description" in df.columns:
-                rules_src = df.copy()
-                # prefer new_description for pattern; else cleaned_description
-                if "new_description" in rules_src.columns:
-                    rules_src["pattern"] = rules_src["new_description"].astype(str)
-                elif "cleaned_description" in rules_src.columns:
-                    rules_src["pattern"] = rules_src["cleaned_description"].astype(str)
-                else:
-                    rules_src["pattern"] = ""
-
-                rules_src["pattern"] = rules_src["pattern"].str.strip().str.lower()
-                rules_src["cat"] = df["category_final"].astype(str).str.strip()
-                rules_src = rules_src[(rules_src["pattern"] != "") & (rules_src["cat"] != "")]
-                rules_df = rules_src[["pattern", "cat"]].drop_duplicates()
+            if pattern_col:
+                # merchant_pattern is the key, so the last of the distinct pairs wins
+                # just as the row-by-row INSERT OR REPLACE did
+                rules = dict(rule_pairs.keys())
 
                 cur.executemany(
                     "INSERT OR REPLACE INTO category_rules (merchant_pattern, category) VALUES (?, ?)",
-                    list(map(tuple, rules_df.to_numpy()))
+                    rules.items()
                 )
                 conn.commit()
-                print(f"✅ Saved {len(rules_df)} category rules.")
+                print(f"✅ Saved {len(rules)} category rules.")
         except Exception as e:
             print("Note: could not save category_rules (table may not exist):", e)
 
@@ -1,8 +1,12 @@
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pacsv
 import sqlite3
 import os
 import hashlib
 from collections import defaultdict
+from datetime import datetime
 from database import initialize_database
 
 # --- Configuration ---
@@ -13,13 +17,53 @@ def get_db_connection():
     """Establishes a connection to the database."""
     conn = sqlite3.connect(DATABASE_PATH)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
     return conn
 
-def _make_unique_hash(account_id: int, date_s: str, cleaned_desc: str, amount_f: float) -> str:
-    """Generates a consistent hash for a transaction."""
-    cleaned_desc = cleaned_desc or ""
-    basis = f"{account_id}|{date_s}|{cleaned_desc.lower().strip()}|{amount_f:.2f}"
-    return hashlib.sha256(basis.encode("utf-8")).hexdigest()
+LOAD_COLUMNS = ['date', 'account', 'amount', 'new_description', 'new_category']
+CHUNK_ROWS = 200_000      # pandas fallback chunk size
+CHUNK_BYTES = 16 << 20    # pyarrow block size
+
+def _iter_load_chunks(path: str, arrow: bool = True):
+    """Yields only the columns the load uses, in bounded chunks; pyarrow's streaming reader when possible."""
+    if arrow:
+        reader = pacsv.open_csv(
+            path,
+            read_options=pacsv.ReadOptions(block_size=CHUNK_BYTES),
+            parse_options=pacsv.ParseOptions(newlines_in_values=True),
+            # all text, blanks/NA markers -> null; amounts are converted below
+            convert_options=pacsv.ConvertOptions(
+                include_columns=LOAD_COLUMNS,
+                column_types={c: pa.string() for c in LOAD_COLUMNS},
+                strings_can_be_null=True,
+            ),
+        )
+        for batch in reader:
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=LOAD_COLUMNS, chunksize=CHUNK_ROWS)
+
+def _scan_accounts(path: str, arrow: bool):
+    """First pass: account names in first-seen order, and the row count."""
+    names = {}
+    n_rows = 0
+    for chunk in _iter_load_chunks(path, arrow):
+        names.update(dict.fromkeys(chunk['account']))
+        n_rows += len(chunk)
+    return list(names), n_rows
+
+def _make_unique_hashes(account_ids, dates, cleaned_descs, amounts) -> list:
+    """Generates consistent hashes for a batch of transactions."""
+    amt = pd.Series(np.char.mod("%.2f", np.asarray(amounts, dtype=float)), dtype=object)
+    basis = (
+        pd.Series(account_ids, dtype=object).astype(str) + "|" + pd.Series(dates, dtype=object)
+        + "|" + pd.Series(cleaned_descs, dtype=object).str.lower().str.strip() + "|" + amt
+    )
+    blake2b = hashlib.blake2b
+    return [blake2b(b.encode("utf-8"), digest_size=16).hexdigest() for b in basis.to_numpy()]
 
 def load_data():
     """Loads data from the cleaned CSV into the database, creating it if necessary."""
@@ -42,67 +86,90 @@ def load_data():
     print(f"Found existing accounts: {list(accounts_map.keys())}")
     
     try:
-        df_acc = pd.read_csv(CSV_FILE_PATH)
-        unique_accounts = df_acc['account'].unique()
+        arrow = True
+        try:
+            unique_accounts, n_rows = _scan_accounts(CSV_FILE_PATH, arrow)
+        except pa.ArrowInvalid:
+            arrow = False
+            unique_accounts, n_rows = _scan_accounts(CSV_FILE_PATH, arrow)
         new_accounts_found = False
         for acc_name in unique_accounts:
-            if acc_name.strip().lower() not in accounts_map:
-                cursor.execute("INSERT OR IGNORE INTO accounts (name) VALUES (?)", (acc_name,))
+            key = acc_name.strip().lower()
+            if key not in accounts_map:
+                # the no-op DO UPDATE makes RETURNING yield the id on conflict too
+                cursor.execute(
+                    "INSERT INTO accounts (name) VALUES (?) "
+                    "ON CONFLICT(name) DO UPDATE SET name = excluded.name RETURNING id",
+                    (acc_name,),
+                )
+                accounts_map[key] = cursor.fetchone()['id']
                 new_accounts_found = True
         if new_accounts_found:
             conn.commit()
             print("New accounts from CSV added to database.")
-            # Re-fetch the accounts map
-            cursor.execute("SELECT id, name FROM accounts")
-            accounts_map = {row['name'].strip().lower(): row['id'] for row in cursor.fetchall()}
     except Exception as e:
         print(f"CRITICAL ERROR: Could not read or create accounts. Error: {e}")
         conn.close()
         return
 
-    # 2. Read the transaction data
-    df = df_acc
-    df['description'] = df['new_description']
-    df['category'] = df['new_category']
-    print(f"Read {len(df)} rows from '{os.path.basename(CSV_FILE_PATH)}'.")
+    print(f"Read {n_rows} rows from '{os.path.basename(CSV_FILE_PATH)}'.")
 
-    # 3. Clear existing transactions for a clean load
+    # Normalize each distinct CSV spelling once; rows then map by their raw name
+    ids_by_raw_name = {name: accounts_map.get(name.strip().lower()) for name in unique_accounts}
+
+    # 2. Clear existing transactions; the chunked inserts share this write transaction
+    cursor.execute("BEGIN IMMEDIATE")
     cursor.execute("DELETE FROM transactions")
     print("Cleared the 'transactions' table for a fresh load.")
 
-    # 4. Insert transactions
+    # 3. Stream the transaction data: build every insert column per chunk, one executemany each
     inserted_count = 0
     skipped_count = 0
-    
-    for _, row in df.iterrows():
-        account_name_in_csv = row['account'].strip().lower()
-        account_id = accounts_map.get(account_name_in_csv)
-
-        if account_id:
-            # CORRECTED INDENTATION FOR TRY/EXCEPT BLOCK
-            try:
-                transaction_date = pd.to_datetime(row['date']).strftime('%Y-%m-%d')
-                amount = row['amount']
-                original_description = row['description']
-                cleaned_description = row['description']
-                unique_hash = _make_unique_hash(account_id, transaction_date, cleaned_description, amount)
+    bad_count = 0
+    for df in _iter_load_chunks(CSV_FILE_PATH, arrow):
+        df['description'] = df['new_description']
+        df['category'] = df['new_category']
+        df['account_id'] = df['account'].map(ids_by_raw_name)
+        df['date_std'] = pd.to_datetime(df['date'], errors='coerce', format='mixed').map(
+            lambda d: d.strftime('%Y-%m-%d') if isinstance(d, datetime) and pd.notna(d) else None
+        )
+        df['amount_num'] = pd.to_numeric(df['amount'], errors='coerce')
 
-                cursor.execute(
-                    """
-                    INSERT INTO transactions (transaction_date, original_description, cleaned_description, amount, category, account_id, unique_hash)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (transaction_date, original_description, cleaned_description, amount, row['category'], account_id, unique_hash)
-                )
-                inserted_count += 1
-            except sqlite3.IntegrityError:
-                skipped_count += 1
-            except Exception as e:
-                print(f"Could not insert row: {row.to_dict()}. Error: {e}")
-                skipped_count += 1
-        else:
-            print(f"Warning: Skipping row because account '{row['account']}' was not found.")
-            skipped_count += 1
+        missing_account = df['account_id'].isna()
+        for name in df.loc[missing_account, 'account']:
+            print(f"Warning: Skipping row because account '{name}' was not found.")
+        # rows the hash cannot be built for: unparseable date, non-text description, non-numeric amount
+        bad = ~missing_account & (
+            df['date_std'].isna() | ~df['description'].map(lambda v: isinstance(v, str)) | (df['amount_num'].isna() & df['amount'].notna())
+        )
+        bad_count += int(bad.sum())
+        load = df[~missing_account & ~bad]
+        account_ids = load['account_id'].astype(int).tolist()
+        unique_hashes = _make_unique_hashes(
+            account_ids, load['date_std'].tolist(), load['description'].tolist(), load['amount_num'].tolist()
+        )
+
+        # OR IGNORE skips rows that would violate a constraint (e.g. a repeated unique_hash)
+        cursor.executemany(
+            """
+            INSERT OR IGNORE INTO transactions (transaction_date, original_description, cleaned_description, amount, category, account_id, unique_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            zip(
+                load['date_std'],
+                load['description'],
+                load['description'],
+                load['amount_num'].astype(object).where(load['amount_num'].notna(), None),
+                load['category'].astype(object).where(load['category'].notna(), None),
+                account_ids,
+                unique_hashes,
+            ),
+        )
+        chunk_inserted = max(cursor.rowcount, 0)
+        inserted_count += chunk_inserted
+        skipped_count += len(df) - chunk_inserted
+    if bad_count:
+        print(f"Could not insert {bad_count} rows with a missing date, description or amount.")
 
     conn.commit()
     conn.close()
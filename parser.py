@@ -5,6 +5,7 @@ from __future__ import annotations
 import io, re, csv
 from datetime import datetime
 from typing import Optional, List, Tuple
+import numpy as np
 import pandas as pd
 
 # ---------------- helpers ----------------
@@ -34,6 +35,37 @@ def _parse_date_any(s: str) -> Optional[str]:
     except Exception:
         return None
 
+def _parse_dates(ser: pd.Series) -> pd.Series:
+    """
+    Column-wide _parse_date_any: one cached pd.to_datetime pass per pattern, in
+    the same order, over the rows still unparsed. Whatever is left goes through
+    _parse_date_any once per distinct value.
+    """
+    # statement dates repeat heavily: parse each distinct value once, then broadcast
+    codes, uniques = pd.factorize(ser)
+    if 0 < len(uniques) < len(ser):
+        parsed = _parse_dates(pd.Series(uniques, dtype=object)).to_numpy()
+        return pd.Series(np.where(codes >= 0, parsed[codes], None), index=ser.index, dtype=object)
+
+    # work on a fresh RangeIndex: read_csv can hand us duplicate row labels
+    s = ser.where(ser.isna(), ser.astype(str).str.strip()).reset_index(drop=True)
+    out = pd.Series([None] * len(s), index=s.index, dtype=object)
+    todo = s.notna() & s.ne("")
+    for fmt in _DATE_PATTERNS:
+        if not todo.any():
+            break
+        parsed = pd.to_datetime(s[todo], format=fmt, errors="coerce", cache=True)
+        hit = parsed.notna()
+        if hit.any():
+            out[hit[hit].index] = parsed[hit].dt.strftime("%Y-%m-%d")
+            todo[hit[hit].index] = False
+    if todo.any():
+        rest = s[todo]
+        lookup = {v: _parse_date_any(v) for v in rest.unique()}
+        out[rest.index] = rest.map(lookup)
+    out.index = ser.index
+    return out
+
 _money_cleaner = re.compile(r"[,$\s]")
 
 def _to_amount(x) -> Optional[float]:
@@ -67,25 +99,95 @@ def _to_amount(x) -> Optional[float]:
     except Exception:
         return None
 
+# str.isspace() characters, spelled out so Arrow's trim strips exactly what str.strip() does
+_WS_CHARS = "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000"
+_PLAIN_NUMBER_RE = r"[-+]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][-+]?[0-9]+)?"
+
+def _to_amount_vec(ser: pd.Series) -> pd.Series:
+    """Column-wide _to_amount on Arrow-backed strings; NaN where _to_amount gives None."""
+    vals, _ = _amount_values(ser)
+    return pd.Series(vals, index=ser.index)
+
+def _amount_values(ser: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """(values, parsed) arrays; parsed is False exactly where _to_amount returns None."""
+    codes, uniques = pd.factorize(ser)
+    if 0 < len(uniques) < len(ser):
+        # convert each distinct cell once and broadcast back through the codes
+        v, ok = _amount_values(pd.Series(uniques, dtype=object))
+        has = codes >= 0
+        return np.where(has, v[codes], np.nan), has & ok[codes]
+
+    present = ser.notna().to_numpy()
+    vals = np.full(len(ser), np.nan)
+    parsed = np.zeros(len(ser), dtype=bool)
+    if not present.any():
+        return vals, parsed
+    s = ser[present].astype(str).astype("string[pyarrow]").str.strip(_WS_CHARS).reset_index(drop=True)
+    tail = s.str[-3:].str.upper()
+    flagged = (tail.eq(" CR") | tail.eq(" DR")).to_numpy(bool)
+    crdr = np.where(tail.eq(" DR").to_numpy(bool), -1.0, 1.0)
+    if flagged.any():
+        s[flagged] = s[flagged].str[:-3].str.strip(_WS_CHARS)
+
+    parens = (s.str.startswith("(") & s.str.endswith(")") & s.str.len().gt(1)).to_numpy(bool)
+    neg = np.where(parens, -1.0, 1.0)
+    if parens.any():
+        s[parens] = s[parens].str[1:-1]
+
+    # literal replaces cover the usual ',', '$' and ' '; rows left with other
+    # whitespace miss the plain-number match and are cleaned per row below
+    s = s.str.replace(",", "", regex=False).str.replace("$", "", regex=False).str.replace(" ", "", regex=False)
+    got = np.full(len(s), np.nan)
+    ok = s.str.fullmatch(_PLAIN_NUMBER_RE).to_numpy(bool)
+    got[ok] = s[ok].to_numpy(object).astype(float)
+    # anything else float() might still take ('1_000', 'nan', non-ASCII digits)
+    retry = np.flatnonzero(~ok & s.ne("").to_numpy(bool))
+    for i, v in zip(retry, s.iloc[retry]):
+        try:
+            got[i] = float(_money_cleaner.sub("", v))
+            ok[i] = True
+        except Exception:
+            pass
+    vals[present] = got * neg * crdr
+    parsed[present] = ok
+    return vals, parsed
+
 def _is_date_series(ser: pd.Series) -> bool:
-    ok = 0
     n = min(len(ser), 50)
-    for v in ser.head(n):
-        if _parse_date_any(str(v)) is not None:
-            ok += 1
+    ok = _parse_dates(ser.head(n).astype(str)).notna().sum()
     return ok >= max(3, int(n * 0.6))
 
 def _is_amount_series(ser: pd.Series) -> bool:
-    ok = 0
     n = min(len(ser), 50)
-    for v in ser.head(n):
-        if _to_amount(v) is not None:
-            ok += 1
-    return ok >= max(3, int(n * 0.6))
+    _, parsed = _amount_values(ser.head(n))
+    return parsed.sum() >= max(3, int(n * 0.6))
+
+def _re_possessive(pattern: str, flags: int = 0) -> re.Pattern:
+    """
+    Compile a pattern written with possessive quantifiers (*+, ++, ?+, {m,n}+),
+    which stop the engine from backtracking into runs it can never give back
+    usefully. re only understands them from Python 3.11; older interpreters get
+    the plain greedy pattern, which matches the same strings.
+    """
+    try:
+        return re.compile(pattern, flags)
+    except re.error:
+        return re.compile(re.sub(r"([*+?}])\+", r"\1", pattern), flags)
+
+# Extractor patterns, compiled once at import (these run per row on every upload)
+_TOFROM_PARTY_RE   = _re_possessive(r"(?i)\b(to|from)\b\s*+[:\-]?+\s*+([A-Za-z][\w .,&'`-]{2,}+)")
+_TWO_PLUS_WS_RE    = re.compile(r"\s{2,}")
+_NAME_ACCT_TAIL_RE = _re_possessive(r"\b(?:acct|account|ending|x{2,}\d+|#\d+).*+$", re.I)
+_NAME_REF_TAIL_RE  = _re_possessive(r"\b(?:id|ref|conf|confirmation)\s*+[:#]?+\s*+\w++.*+$", re.I)
+_ZELLE_TOFROM_RE   = _re_possessive(r"(?i)zelle(?:\s+payment|\s+transfer|\s+credit|\s+debit|)\s*+(to|from)\s*+[:\-]?+\s*+([A-Za-z][\w .,&'`-]{2,}+)")
+_ZELLE_TRAILING_RE = re.compile(r"(?i)(?:to|from)\s+([A-Za-z][\w .,&'`-]{2,}).*zelle")
+
 PROVIDERS = [
     "zelle","venmo","cash app","cashapp","paypal","apple cash","google pay",
     "ach","wire","transfer","online transfer","external transfer","p2p"
 ]
+# one scan tells whether any provider occurs at all; most descriptions have none
+_PROVIDERS_RE = re.compile("|".join(map(re.escape, PROVIDERS)))
 
 def extract_to_from_party(text: str) -> tuple[str|None, str|None, str|None]:
     """
@@ -100,19 +202,21 @@ def extract_to_from_party(text: str) -> tuple[str|None, str|None, str|None]:
     slow = s.lower()
 
     provider = None
-    for p in PROVIDERS:
-        if p in slow:
-            provider = "zelle" if "zelle" in p else p
-            break
+    if _PROVIDERS_RE.search(slow):
+        # list order decides (e.g. 'transfer' before 'online transfer'), not position
+        for p in PROVIDERS:
+            if p in slow:
+                provider = "zelle" if "zelle" in p else p
+                break
 
     # unified to/from counterparty pattern
-    m = re.search(r"(?i)\b(to|from)\b\s*[:\-]?\s*([A-Za-z][\w .,&'`-]{2,})", s)
+    m = _TOFROM_PARTY_RE.search(s)
     if m:
         direction = m.group(1).strip().lower()  # 'to' or 'from'
-        name = re.sub(r"\s{2,}", " ", m.group(2)).strip(" -:.,")
+        name = _TWO_PLUS_WS_RE.sub(" ", m.group(2)).strip(" -:.,")
         # strip trailing refs/emails/ids
-        name = re.sub(r"\b(?:acct|account|ending|x{2,}\d+|#\d+).*$", "", name, flags=re.I).strip()
-        name = re.sub(r"\b(?:id|ref|conf|confirmation)\s*[:#]?\s*\w+.*$", "", name, flags=re.I).strip()
+        name = _NAME_ACCT_TAIL_RE.sub("", name).strip()
+        name = _NAME_REF_TAIL_RE.sub("", name).strip()
         if name:
             if not provider:
                 # if we saw 'transfer' terms but no branded provider, tag as generic transfer
@@ -139,35 +243,76 @@ def extract_zelle_to_from(text: str) -> str | None:
         return None
 
     # Common patterns
-    m = re.search(r"(?i)zelle(?:\s+payment|\s+transfer|\s+credit|\s+debit|)\s*(to|from)\s*[:\-]?\s*([A-Za-z][\w .,&'`-]{2,})", s)
+    m = _ZELLE_TOFROM_RE.search(s)
     if m:
         direction = m.group(1).strip().title()  # To / From
-        name = re.sub(r"\s{2,}", " ", m.group(2)).strip(" -:.,")
+        name = _TWO_PLUS_WS_RE.sub(" ", m.group(2)).strip(" -:.,")
         # Trim trailing ids/emails if they snuck in
-        name = re.sub(r"\b(?:acct|account|ending|x{2,}\d+|#\d+).*$", "", name, flags=re.I).strip()
-        name = re.sub(r"\b(?:id|ref|conf|confirmation)\s*[:#]?\s*\w+.*$", "", name, flags=re.I).strip()
+        name = _NAME_ACCT_TAIL_RE.sub("", name).strip()
+        name = _NAME_REF_TAIL_RE.sub("", name).strip()
         return f"Zelle {direction} {name}" if name else f"Zelle {direction}"
 
     # Fallbacks where bank emits separate tokens
-    m2 = re.search(r"(?i)(?:to|from)\s+([A-Za-z][\w .,&'`-]{2,}).*zelle", s)
+    m2 = _ZELLE_TRAILING_RE.search(s)
     if m2:
         direction = "To" if " to " in s.lower() else "From" if " from " in s.lower() else ""
-        name = re.sub(r"\s{2,}", " ", m2.group(1)).strip(" -:.,")
+        name = _TWO_PLUS_WS_RE.sub(" ", m2.group(1)).strip(" -:.,")
         if direction and name:
             return f"Zelle {direction} {name}"
 
     # Generic: keep at least 'Zelle' if we can't find a counterparty
     return "Zelle"
 
+
+def _zelle_merchants(descs: pd.Series) -> pd.Series:
+    """
+    Merchant column from raw descriptions: extract_zelle_to_from for rows that
+    mention Zelle, '' for the rest. One regex pass over the column does both the
+    detection and the To/From capture.
+    """
+    s = descs.astype(str).reset_index(drop=True)  # row labels may repeat
+    out = pd.Series("", index=s.index, dtype=object)
+
+    m = s.str.extract(_ZELLE_TOFROM_RE)
+    hit = m[0].notna()  # the pattern itself requires 'zelle'
+    if hit.any():
+        direction = m.loc[hit, 0].str.strip().str.title()
+        name = (m.loc[hit, 1].str.replace(_TWO_PLUS_WS_RE, " ", regex=True).str.strip(" -:.,")
+                .str.replace(_NAME_ACCT_TAIL_RE, "", regex=True).str.strip()
+                .str.replace(_NAME_REF_TAIL_RE, "", regex=True).str.strip())
+        out[hit] = ("Zelle " + direction).where(name.eq(""), "Zelle " + direction + " " + name)
+
+    # only rows the capture missed still need the plain substring check
+    rest = ~hit
+    rest[rest] = s[rest].str.contains("zelle", case=False, regex=False).to_numpy(bool)
+    out[rest] = "Zelle"
+    rest = ~hit
+    if rest.any():
+        m2 = s[rest].str.extract(_ZELLE_TRAILING_RE)[0].dropna()
+        if not m2.empty:
+            low = s[m2.index].str.lower()
+            direction = pd.Series("", index=m2.index, dtype=object)
+            direction[low.str.contains(" from ", regex=False)] = "From"
+            direction[low.str.contains(" to ", regex=False)] = "To"
+            name = m2.str.replace(_TWO_PLUS_WS_RE, " ", regex=True).str.strip(" -:.,")
+            ok = direction.ne("") & name.ne("")
+            out[ok[ok].index] = "Zelle " + direction[ok] + " " + name[ok]
+    out.index = descs.index
+    return out
+
 # --- Helpers to sanitize the tail after "to/from" ---
 __RE_MULTI_WS   = re.compile(r"\s{2,}")
 __RE_MASKED_AC  = re.compile(r"(?i)\b(?:x{2,}|[*#]{2,})\d{2,}\b")  # XXXXXX4311, ****1234, ###9876
-__RE_TRAIL_META = re.compile(
-    r"(?i)\b(?:ref(?:erence)?|id|trace|conf(?:irmation)?|confirmation|txn|trans(?:action)?)\s*[:#]?\s*[\w-]+.*$"
+__RE_TRAIL_META = _re_possessive(
+    r"(?i)\b(?:ref(?:erence)?|id|trace|conf(?:irmation)?|confirmation|txn|trans(?:action)?)\s*+[:#]?+\s*+[\w-]++.*+$"
 )
 __RE_TRAIL_DATE = re.compile(
     r"(?i)\bon\s+\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?(?:\b|$)"
 )
+__RE_ACCT_WORDS = re.compile(r"(?i)\b(?:acct|account|ending|number)\b[:#]?\s*")
+__RE_XFER_HINT  = re.compile(r"(?i)\b(transfer|payment|pmt|xfer)\b")
+__RE_TOFROM     = re.compile(r"(?i)\b(to|from)\b\s*[:#-]?\s*(.+)")
+__RE_STRAY_CODE = re.compile(r"(?i)(ref|id|conf|trace|txn)[\s:#-]*\w+")
 
 def _strip_tofrom_tail(s: str) -> str:
     if not s:
@@ -178,7 +323,7 @@ def _strip_tofrom_tail(s: str) -> str:
     # drop masked account digits (keep the account name)
     s = __RE_MASKED_AC.sub("", s)
     # common noise around account hints
-    s = re.sub(r"(?i)\b(?:acct|account|ending|number)\b[:#]?\s*", "", s)
+    s = __RE_ACCT_WORDS.sub("", s)
     s = s.strip(" -:.,")
     s = __RE_MULTI_WS.sub(" ", s)
     return s
@@ -196,11 +341,11 @@ def extract_to_from_party(text: str) -> str | None:
     s = str(text)
 
     # only attempt if line looks like a transfer/payment/etc.
-    if not re.search(r"(?i)\b(transfer|payment|pmt|xfer)\b", s):
+    if not __RE_XFER_HINT.search(s):
         return None
 
     # Prefer the token AFTER 'to|from'
-    m = re.search(r"(?i)\b(to|from)\b\s*[:#-]?\s*(.+)", s)
+    m = __RE_TOFROM.search(s)
     if not m:
         return None
 
@@ -208,7 +353,7 @@ def extract_to_from_party(text: str) -> str | None:
     tail = _strip_tofrom_tail(m.group(2))
 
     # If the tail is still empty or clearly a stray code, bail
-    if not tail or re.fullmatch(r"(?i)(ref|id|conf|trace|txn)[\s:#-]*\w+", tail):
+    if not tail or __RE_STRAY_CODE.fullmatch(tail):
         return None
 
     # Normalize common account phrases (keeps the account name)
@@ -227,13 +372,17 @@ AMOUNT_HEADERS = {"amount","transaction amount","debit","credit","value","amount
 TYPE_HEADERS = {"type","dr/cr","credit/debit"}
 CATEGORY_HEADERS = {"category","merchant category","mcc"}
 
+# rows looked at when no description header matched and the wordiest column is picked
+DESC_SAMPLE_ROWS = 200
+
 def _best_header_match(columns: List[str]) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]:
-    cols_lower = [c.strip().lower() for c in columns]
+    # normalized header -> first column carrying it
+    by_lower = {}
+    for i, c in enumerate(columns):
+        by_lower.setdefault(c.strip().lower(), i)
     def find_from(cands):
-        for i, c in enumerate(cols_lower):
-            if c in cands:
-                return columns[i]
-        return None
+        hits = [by_lower[c] for c in cands if c in by_lower]
+        return columns[min(hits)] if hits else None
     return (
         find_from(DATE_HEADERS),
         find_from(DESC_HEADERS),
@@ -243,7 +392,29 @@ def _best_header_match(columns: List[str]) -> Tuple[Optional[str], Optional[str]
 
 # ---------------- core CSV loading ----------------
 
+# str(v).strip() over a whole 2-D block in one ufunc pass
+_strip_cells = np.frompyfunc(lambda v: str(v).strip(), 1, 1)
+
 def _read_csv_try(file_bytes: bytes, delimiter: Optional[str], header: Optional[int]) -> Optional[pd.DataFrame]:
+    # With a sniffed delimiter try the C engine first. Anything it rejects or
+    # reads differently (ragged rows turned into an implicit index column) goes
+    # through the python engine exactly as before.
+    if delimiter:
+        try:
+            df = pd.read_csv(
+                io.BytesIO(file_bytes),
+                sep=delimiter,
+                engine="c",
+                low_memory=False,
+                header=header,
+                dtype=str,
+                encoding="utf-8",
+                skip_blank_lines=True
+            )
+            if isinstance(df.index, pd.RangeIndex):
+                return df
+        except Exception:
+            pass
     try:
         return pd.read_csv(
             io.BytesIO(file_bytes),
@@ -305,22 +476,33 @@ def intelligent_parser(file_stream: io.BytesIO) -> Optional[pd.DataFrame]:
 
     # Trim headers & cell whitespace
     df.columns = [str(c).strip() for c in df.columns]
-    for c in df.columns:
-        if df[c].dtype == object:
-            df[c] = df[c].astype(str).str.strip()
+    obj_cols = df.select_dtypes(include="object").columns
+    if len(obj_cols):
+        df[obj_cols] = _strip_cells(df[obj_cols].to_numpy())
 
     # Header-based mapping
     date_col, desc_col, amount_col, type_col = _best_header_match(list(df.columns))
 
+    # Probe each column at most once; the header pick is re-seen by the content scan
+    date_probe, amount_probe = {}, {}
+    def is_date(c):
+        if c not in date_probe:
+            date_probe[c] = _is_date_series(df[c])
+        return date_probe[c]
+    def is_amount(c):
+        if c not in amount_probe:
+            amount_probe[c] = _is_amount_series(df[c])
+        return amount_probe[c]
+
     # Infer by content if needed
-    if not date_col or not _is_date_series(df[date_col]):
+    if not date_col or not is_date(date_col):
         date_col = None
         for c in df.columns:
-            if _is_date_series(df[c]):
+            if is_date(c):
                 date_col = c
                 break
 
-    if not amount_col or not _is_amount_series(df[amount_col]):
+    if not amount_col or not is_amount(amount_col):
         amount_col = None
         # Handle debit/credit split files by synthesizing a single amount
         debit_cols, credit_cols = [], []
@@ -333,20 +515,21 @@ def intelligent_parser(file_stream: io.BytesIO) -> Optional[pd.DataFrame]:
         if debit_cols or credit_cols:
             amt = pd.Series(0.0, index=df.index, dtype=float)
             for c in credit_cols:
-                amt = amt + pd.to_numeric(df[c].map(_to_amount), errors="coerce").fillna(0.0)
+                amt = amt + _to_amount_vec(df[c]).fillna(0.0)
             for c in debit_cols:
-                amt = amt - pd.to_numeric(df[c].map(_to_amount), errors="coerce").fillna(0.0)
+                amt = amt - _to_amount_vec(df[c]).fillna(0.0)
             df["_amount_synth"] = amt
             amount_col = "_amount_synth"
         else:
             for c in df.columns:
-                if _is_amount_series(df[c]):
+                if is_amount(c):
                     amount_col = c
                     break
 
     if not desc_col:
-        # choose the wordiest column as description
-        desc_col = max(df.columns, key=lambda c: df[c].astype(str).str.len().mean())
+        # choose the wordiest column as description (judged on the first rows)
+        sample = df.head(DESC_SAMPLE_ROWS).astype(str)
+        desc_col = sample.apply(lambda s: s.str.len().mean()).idxmax()
 
     # If essentials still missing, bail
     if not date_col or not amount_col or not desc_col:
@@ -354,21 +537,23 @@ def intelligent_parser(file_stream: io.BytesIO) -> Optional[pd.DataFrame]:
 
     # Build normalized frame
     out = pd.DataFrame()
-    out["transaction_date"] = df[date_col].map(_parse_date_any)
+    out["transaction_date"] = _parse_dates(df[date_col])
     out["original_description"] = df[desc_col].astype(str)
     out["cleaned_description"]  = out["original_description"].str.strip()
 
     if amount_col == "_amount_synth":
         out["amount"] = df["_amount_synth"]
     else:
-        out["amount"] = df[amount_col].map(_to_amount)
+        out["amount"] = _to_amount_vec(df[amount_col])
 
     # Use type column if it clearly signals debit/credit
     if type_col and type_col in df.columns:
-        t = df[type_col].astype(str).str.lower()
+        is_debit = df[type_col].astype(str).str.lower().isin(["debit","debits","dr"]).to_numpy()
         # If this column looks categorical, flip amounts where needed
-        if t.isin(["debit","debits","dr"]).mean() >= 0.6:
-            out.loc[t.isin(["debit","debits","dr"]) & (out["amount"] > 0), "amount"] *= -1
+        if is_debit.mean() >= 0.6:
+            amt = out["amount"].to_numpy(dtype=float, copy=True)
+            np.negative(amt, where=is_debit & (amt > 0), out=amt)
+            out["amount"] = amt
 
     # Optional category passthrough
     cat_col = None
@@ -378,25 +563,15 @@ def intelligent_parser(file_stream: io.BytesIO) -> Optional[pd.DataFrame]:
             break
     out["category"] = (df[cat_col].astype(str).str.strip() if cat_col else "Uncategorized")
 
-    # Keep only valid rows
+    # Keep only valid rows (dates are 'YYYY-MM-DD' or None, amounts float64 or NaN)
     out = out.dropna(subset=["transaction_date", "amount"])
-    out = out[out["transaction_date"].astype(str).str.len() > 0]
-    out = out[pd.to_numeric(out["amount"], errors="coerce").notna()]
 
     if out.empty:
         return None
 
-    # Final coercions
-    out["amount"] = out["amount"].astype(float)
-
     # ------------------------ ADDED: merchant enrichment (Zelle) ------------------------
-    # Ensure merchant column exists
-    out["merchant"] = ""
-
-    # Detect Zelle To/From for merchant where applicable, based on original_description
-    zmask = out["original_description"].astype(str).str.contains("zelle", case=False, na=False)
-    if zmask.any():
-        out.loc[zmask, "merchant"] = out.loc[zmask, "original_description"].apply(extract_zelle_to_from).fillna("Zelle")
+    # Zelle To/From for merchant where applicable ('' otherwise), based on original_description
+    out["merchant"] = _zelle_merchants(out["original_description"])
 
     # If cleaned_description is blank, fall back to merchant to keep UI readable
     blank_clean = out["cleaned_description"].astype(str).str.strip().eq("")
@@ -1,16 +1,27 @@
-from fernet_util import FERNET as __FERNET_IMPORTED__
-from fernet_util import FERNET as __FERNET_FROM_UTIL__
-FERNET = __FERNET_IMPORTED__  # from fernet_util
 import os, json, sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Optional, List, Dict
-from fernet_util import encrypt, decrypt
+from fernet_util import FERNET, encrypt, decrypt
 
 # DB helper
 try:
     from database import get_db  # if present in your project
 except Exception:
+    _WAL_READY = set()
+
     def get_db():
-        return sqlite3.connect(os.getenv("DB_PATH", "finance.db"))
+        db = os.getenv("DB_PATH", "finance.db")
+        con = sqlite3.connect(db)
+        # journal_mode sticks to the file: switch it once per process
+        if db not in _WAL_READY:
+            con.execute("PRAGMA journal_mode=WAL")
+            _WAL_READY.add(db)
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+        con.execute("PRAGMA temp_store=MEMORY")
+        con.execute("PRAGMA cache_size=-65536")    # 64 MiB page cache
+        return con
 
 # Plaid client
 from plaid.api import plaid_api
@@ -23,16 +34,29 @@ from plaid.model.item_public_token_exchange_request import ItemPublicTokenExchan
 from plaid.model.transactions_get_request import TransactionsGetRequest
 from plaid.model.transactions_get_request_options import TransactionsGetRequestOptions
 
+# concurrent /transactions/get page requests per fetch
+PAGE_WORKERS = int(os.getenv("PLAID_PAGE_WORKERS", "8"))
+
 def get_plaid_client():
+    return _plaid_client(
+        os.getenv("PLAID_ENV","sandbox").lower(),
+        os.getenv("PLAID_CLIENT_ID",""),
+        os.getenv("PLAID_SECRET",""),
+    )
+
+@lru_cache(maxsize=4)
+def _plaid_client(env: str, client_id: str, secret: str):
+    # One PlaidApi (and urllib3 pool) per credential set, so keep-alive
+    # connections are reused across requests instead of re-handshaking.
     cfg = Configuration(
         host = {
             "sandbox":"https://sandbox.plaid.com",
             "development":"https://development.plaid.com",
             "production":"https://production.plaid.com"
-        }[os.getenv("PLAID_ENV","sandbox").lower()],
+        }[env],
         api_key = {
-            "clientId": os.getenv("PLAID_CLIENT_ID",""),
-            "secret": os.getenv("PLAID_SECRET",""),
+            "clientId": client_id,
+            "secret": secret,
         }
     )
     return plaid_api.PlaidApi(ApiClient(cfg))
@@ -60,6 +84,8 @@ def exchange_public_token(public_token: str) -> Dict:
     item_id = ex["item_id"]
 
     con = get_db(); cur = con.cursor()
+    # table bootstrap + item upsert share one transaction (one sync at commit)
+    cur.execute("BEGIN")
     cur.execute("""
       CREATE TABLE IF NOT EXISTS plaid_items(
         id INTEGER PRIMARY KEY, item_id TEXT UNIQUE, access_token_enc TEXT, institution_name TEXT, created_at TEXT DEFAULT (datetime('now'))
@@ -72,6 +98,8 @@ def exchange_public_token(public_token: str) -> Dict:
 
 # ---- Transactions fetches ----
 def _get_access_token(item_id: str) -> Optional[str]:
+    # always read the stored row (a re-link rotates it); decrypt is lru_cached
+    # on the ciphertext, so an unchanged token skips the HMAC check + AES
     con = get_db(); cur = con.cursor()
     row = cur.execute("SELECT access_token_enc FROM plaid_items WHERE item_id=?", (item_id,)).fetchone()
     con.close()
@@ -83,18 +111,25 @@ def transactions_get_by_date(item_id: str, start: str, end: str, account_ids: Op
     if not token: return {"error":"unknown item_id"}
 
     client = get_plaid_client()
-    all_txns = []
-    count, offset = 500, 0
-    while True:
+    count = 500
+
+    def fetch(offset: int) -> Dict:
         opts = TransactionsGetRequestOptions(
             account_ids=account_ids or None,
             count=count, offset=offset,
             include_personal_finance_category=False
         )
         req = TransactionsGetRequest(access_token=token, start_date=start, end_date=end, options=opts)
-        resp = client.transactions_get(req).to_dict()
-        all_txns.extend(resp.get("transactions", []))
-        total = resp.get("total_transactions", 0)
-        offset += count
-        if len(all_txns) >= total: break
+        return client.transactions_get(req).to_dict()
+
+    # Page 1 tells us the total; the remaining offset pages are independent, so
+    # fetch them concurrently and stitch them back together in offset order.
+    first = fetch(0)
+    all_txns = list(first.get("transactions", []))
+    total = first.get("total_transactions", 0)
+    offsets = list(range(count, total, count))
+    if offsets:
+        with ThreadPoolExecutor(max_workers=min(PAGE_WORKERS, len(offsets))) as pool:
+            for resp in pool.map(fetch, offsets):
+                all_txns.extend(resp.get("transactions", []))
     return {"transactions": all_txns, "total": len(all_txns)}
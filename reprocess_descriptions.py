@@ -1,11 +1,17 @@
 # reprocess_descriptions.py (v2 - Corrected column name)
+import sys
 from database import get_db_connection
-from ai_merchant_extractor import extract_merchant_names
+from ai_merchant_extractor import extract_merchant_names, extract_merchant_names_batch_api
 
-def run_reprocessing():
+# rows per executemany inside the single update transaction
+UPDATE_BATCH_ROWS = 5000
+
+def run_reprocessing(batch_api: bool = False):
     """
     Fetches all transactions, re-processes their descriptions using the AI
     name extractor, and updates them in the database.
+    batch_api: opt in to the OpenAI Batch API (half price, but results can take
+    up to 24h); the default is the synchronous per-chunk calls.
     """
     print("--- Starting to re-process all existing transaction descriptions ---")
     conn = get_db_connection()
@@ -25,7 +31,8 @@ def run_reprocessing():
         descriptions_list = [t['original_description'] for t in transactions]
         
         # Call the AI extractor to get the new, improved names
-        new_cleaned_names = extract_merchant_names(descriptions_list)
+        extract = extract_merchant_names_batch_api if batch_api else extract_merchant_names
+        new_cleaned_names = extract(descriptions_list)
         
         # Prepare the data for a bulk update
         update_data = []
@@ -34,12 +41,18 @@ def run_reprocessing():
 
         print("Updating database with new descriptions...")
         cursor = conn.cursor()
-        cursor.executemany(
-            "UPDATE transactions SET cleaned_description = ? WHERE id = ?",
-            update_data
-        )
+        # One write transaction for every batch: a single WAL commit at the end;
+        # IMMEDIATE takes the write lock before the first UPDATE
+        cursor.execute("BEGIN IMMEDIATE")
+        updated = 0
+        for start in range(0, len(update_data), UPDATE_BATCH_ROWS):
+            cursor.executemany(
+                "UPDATE transactions SET cleaned_description = ? WHERE id = ?",
+                update_data[start:start + UPDATE_BATCH_ROWS]
+            )
+            updated += cursor.rowcount
         conn.commit()
-        print(f"✅ Successfully updated {cursor.rowcount} transactions.")
+        print(f"✅ Successfully updated {updated} transactions.")
 
     except Exception as e:
         print(f"❌ An error occurred during reprocessing: {e}")
@@ -49,4 +62,5 @@ def run_reprocessing():
         print("--- Reprocessing complete ---")
 
 if __name__ == '__main__':
-    run_reprocessing()
\ No newline at end of file
+    # --batch: submit a Batch API job instead of the blocking per-chunk calls
+    run_reprocessing(batch_api="--batch" in sys.argv[1:])
@@ -7,6 +7,8 @@ DB   = os.path.join(BASE, "finance.db")
 
 con = sqlite3.connect(DB)
 con.row_factory = sqlite3.Row
+con.execute("PRAGMA journal_mode=WAL")
+con.execute("PRAGMA synchronous=NORMAL")
 cur = con.cursor()
 
 rows = cur.execute("""
@@ -16,16 +18,20 @@ rows = cur.execute("""
     AND original_description LIKE '%Zelle%' COLLATE NOCASE
 """).fetchall()
 
-updated = 0
+upd_merchant = []
+upd_cleaned = []
 for r in rows:
     newm = extract_zelle_to_from(r["original_description"] or "") or None
     if newm:
-        cur.execute("UPDATE transactions SET merchant=? WHERE id=?", (newm, r["id"]))
+        upd_merchant.append((newm, r["id"]))
         # If cleaned_description is blank, use merchant for readability
         if not (r["cleaned_description"] or "").strip():
-            cur.execute("UPDATE transactions SET cleaned_description=? WHERE id=?", (newm, r["id"]))
-        updated += 1
+            upd_cleaned.append((newm, r["id"]))
+updated = len(upd_merchant)
 
+cur.execute("BEGIN IMMEDIATE")
+cur.executemany("UPDATE transactions SET merchant=? WHERE id=?", upd_merchant)
+cur.executemany("UPDATE transactions SET cleaned_description=? WHERE id=?", upd_cleaned)
 con.commit()
 con.close()
 print(f"Backfilled Zelle merchant for {updated} rows.")
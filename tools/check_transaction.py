@@ -17,7 +17,14 @@ def find_transaction(search_term: str):
         """
         # The '%' are wildcards, so it finds the term anywhere in the description
         params = (f'%{search_term}%',)
-        
+        has_fts = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='transactions_fts'"
+        ).fetchone()
+        if has_fts and len(search_term) >= 3:
+            # the trigram index narrows the candidates; the outer LIKE keeps the exact semantics
+            query += " AND id IN (SELECT rowid FROM transactions_fts WHERE cleaned_description LIKE ?)"
+            params += params
+
         cursor.execute(query, params)
         rows = cursor.fetchall()
 
@@ -46,28 +46,29 @@ LIKELY_PREFILL_MERCHANT_COLS = [
     "merchant", "new_description", "cleaned_description"
 ]
 
-def row_to_raw(r: pd.Series) -> str:
-    """Concatenate best-guess description columns into a single raw string."""
-    parts = []
+def _stripped_text(col: pd.Series) -> pd.Series:
+    """str(v).strip() per cell, '' for missing cells."""
+    return col.astype(str).str.strip().where(col.notna(), "")
+
+def raw_text_column(df: pd.DataFrame) -> pd.Series:
+    """Concatenate best-guess description columns into a single raw string per row."""
+    raw = pd.Series("", index=df.index, dtype=object)
     for c in LIKELY_DESC_COLS:
-        try:
-            if c in r and pd.notna(r[c]):
-                s = str(r[c]).strip()
-                if s:
-                    parts.append(s)
-        except Exception:
-            pass
-    return " | ".join(parts)
-
-def pick_prefill_merchant(r: pd.Series) -> str:
-    """If the CSV already has a merchant-ish column, surface it for comparison."""
-    for c in LIKELY_PREFILL_MERCHANT_COLS:
-        try:
-            if c in r and pd.notna(r[c]) and str(r[c]).strip():
-                return str(r[c]).strip()
-        except Exception:
+        if c not in df.columns:
             continue
-    return ""
+        part = _stripped_text(df[c])
+        joined = raw.where(part == "", raw + " | " + part)
+        raw = joined.where(raw != "", part)
+    return raw
+
+def prefill_merchant_column(df: pd.DataFrame) -> pd.Series:
+    """If the CSV already has a merchant-ish column, surface it for comparison (first non-blank wins)."""
+    pick = pd.Series("", index=df.index, dtype=object)
+    for c in reversed(LIKELY_PREFILL_MERCHANT_COLS):
+        if c in df.columns:
+            part = _stripped_text(df[c])
+            pick = part.where(part != "", pick)
+    return pick
 
 # ---------- Local (non-AI) inference helpers ----------
 
@@ -78,6 +79,12 @@ _JUNKWORDS_RE = re.compile(
     r"card\s*(?:payment|purchase)|checking\s+acct|acct|account|transfer|debit|credit|withdrawal|deposit|"
     r"purchase|statement|transaction|fee|interest|charge|conf(?:irmation)?)\b"
 )
+_NON_NAME_CHARS_RE = re.compile(r"[^A-Za-z&'`.,\-()/\s]")  # keep common punctuation
+_MULTI_WS_RE = re.compile(r"\s{2,}")
+_WS_RE = re.compile(r"\s+")
+_ALPHA_RE = re.compile(r"[A-Za-z]")
+_TRANSFER_DIR_RE = re.compile(r"(?i)\bTRANSFER\s+(TO|FROM)\b(?:\s+(.*))?$")
+_ZELLE_DIR_RE = re.compile(r"(?i)\s*zelle\s+(to|from)\s+(.*)$")
 
 def _fallback_merchant_guess(s: str) -> str:
     """
@@ -91,15 +98,15 @@ def _fallback_merchant_guess(s: str) -> str:
     txt = _PHONE_RE.sub(" ", txt)
     txt = _JUNKWORDS_RE.sub(" ", txt)
     txt = _NUMTOKEN_RE.sub(" ", txt)
-    txt = re.sub(r"[^A-Za-z&'`.,\-()/\s]", " ", txt)  # keep common punctuation
-    txt = re.sub(r"\s{2,}", " ", txt).strip()
+    txt = _NON_NAME_CHARS_RE.sub(" ", txt)
+    txt = _MULTI_WS_RE.sub(" ", txt).strip()
     if not txt:
         return ""
-    tokens = [t for t in re.split(r"\s+", txt) if re.search(r"[A-Za-z]", t)]
+    tokens = [t for t in _WS_RE.split(txt) if _ALPHA_RE.search(t)]
     if not tokens:
         return ""
     guess = " ".join(tokens[:4])
-    return re.sub(r"\s{2,}", " ", guess).strip().title()
+    return _MULTI_WS_RE.sub(" ", guess).strip().title()
 
 # --- Transfer result normalizer: supports string OR dict returns ---
 def _normalize_transfer_result(ret) -> dict | None:
@@ -120,7 +127,7 @@ def _normalize_transfer_result(ret) -> dict | None:
         direction = (ret.get("direction") or "").strip().lower()
         counterparty = (ret.get("counterparty") or "").strip()
         if not direction:
-            m = re.search(r"(?i)\bTRANSFER\s+(TO|FROM)\b(?:\s+(.*))?$", final)
+            m = _TRANSFER_DIR_RE.search(final)
             if m:
                 direction = m.group(1).lower()
                 counterparty = counterparty or (m.group(2) or "").strip()
@@ -137,7 +144,7 @@ def _normalize_transfer_result(ret) -> dict | None:
         final = ret.strip()
         if not final:
             return None
-        m = re.search(r"(?i)\bTRANSFER\s+(TO|FROM)\b(?:\s+(.*))?$", final)
+        m = _TRANSFER_DIR_RE.search(final)
         direction = m.group(1).lower() if m else ""
         counterparty = (m.group(2) or "").strip() if m else ""
         return {
@@ -176,7 +183,7 @@ def local_infer(raw_text: str):
         z = None
     if z:
         z = z.strip()
-        m = re.match(r"(?i)\s*zelle\s+(to|from)\s+(.*)$", z)
+        m = _ZELLE_DIR_RE.match(z)
         direction = ""
         counterparty = ""
         if m:
@@ -224,8 +231,8 @@ def main():
 
     # Sample top N
     df = df.head(args.limit).copy()
-    df["__raw__"] = df.apply(row_to_raw, axis=1)
-    df["__prefill__"] = df.apply(pick_prefill_merchant, axis=1)
+    df["__raw__"] = raw_text_column(df)
+    df["__prefill__"] = prefill_merchant_column(df)
 
     out_rows = []
 
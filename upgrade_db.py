@@ -1,6 +1,12 @@
 # upgrade_db.py (v2 - Now creates the full schema)
+import sqlite3
 from database import get_db_connection, initialize_database # Import the initializer
 
+# (column, DDL) upgrades, applied in order; re-running is a no-op
+COLUMN_UPGRADES = [
+    ("sub_category", "ALTER TABLE transactions ADD COLUMN sub_category TEXT"),
+]
+
 def setup_database():
     """
     Ensures the database is fully created from the schema and then applies
@@ -19,17 +25,17 @@ def setup_database():
     try:
         cursor = conn.cursor()
         
-        # Check if the sub_category column already exists
-        cursor.execute("PRAGMA table_info(transactions)")
-        columns = [row['name'] for row in cursor.fetchall()]
-        
-        if 'sub_category' not in columns:
-            print("Applying upgrade: Adding 'sub_category' column...")
-            cursor.execute("ALTER TABLE transactions ADD COLUMN sub_category TEXT")
-            conn.commit()
-            print("✅ Column 'sub_category' added successfully.")
-        else:
-            print("✅ 'sub_category' column already exists.")
+        # ADD COLUMN fails with "duplicate column" when it already exists,
+        # so no table_info scan is needed to decide
+        for column, ddl in COLUMN_UPGRADES:
+            try:
+                cursor.execute(ddl)
+                print(f"✅ Column '{column}' added successfully.")
+            except sqlite3.OperationalError as e:
+                if "duplicate column" not in str(e).lower():
+                    raise
+                print(f"✅ '{column}' column already exists.")
+        conn.commit()
             
     except Exception as e:
         print(f"❌ An error occurred during database upgrade: {e}")